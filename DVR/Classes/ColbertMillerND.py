@@ -7,7 +7,7 @@ of 1D DVRs
 
 import numpy as np
 import scipy.sparse as sp
-import ColbertMiller1D as cm1D
+from . import ColbertMiller1D as cm1D
 
 def grid(domain=None, divs=None, flavor='[-inf,inf]', **kw):
     """
@@ -68,10 +68,15 @@ def kinetic_energy(grid=None, m=1, hb=1, flavor='[-inf,inf]', **kw):
     return ke
 
 
-def potential_energy(grid=None, potential_function=None, potential_values=None, **kw):
+def potential_energy(grid=None, potential_function=None, potential_values=None, potential_grid=None, **kw):
 
     if potential_values is not None:
         return sp.diags([potential_values], [0])
+    elif potential_function is None and potential_grid is not None:
+        from ..Interpolation import PotentialInterpolator
+        if not isinstance(potential_grid, PotentialInterpolator):
+            potential_grid = PotentialInterpolator(potential_grid)
+        return sp.diags([potential_grid(grid)], [0])
     else:
         from functools import reduce
         from operator import mul
@@ -82,9 +87,109 @@ def potential_energy(grid=None, potential_function=None, potential_values=None,
         return sp.diags([pots], [0])
 
 
-def wavefunctions(hamiltonian=None, num_wfns=10, **kw):
-    """Computes the wavefunctions using sparse methods"""
+def _initial_guess(guess, npts, grid_mask=None):
+    """
+    Pulls a warm-start subspace out of a previous set of results
+
+    :param guess: previous `DVR.Results`, `DVRWavefunctions`, or array of wavefunctions (one per row)
+    :type guess:
+    :param npts: number of points in the current Hamiltonian
+    :type npts: int
+    :param grid_mask: mask used to prune the current grid
+    :type grid_mask: np.ndarray | None
+    :return: guess vectors, one per column
+    :rtype: np.ndarray
+    """
+
+    if hasattr(guess, 'wavefunctions'): # DVR.Results
+        guess = guess.wavefunctions
+    if hasattr(guess, 'wavefunctions'): # DVRWavefunctions
+        guess = guess.wavefunctions
+    guess = np.asarray(guess)
+    if guess.ndim == 1:
+        guess = guess[np.newaxis]
+    if grid_mask is not None and guess.shape[1] == len(grid_mask) != npts:
+        guess = guess[:, grid_mask]
+    if guess.shape[1] != npts:
+        raise ValueError("initial guess has {} points but the Hamiltonian has {}".format(guess.shape[1], npts))
+    return guess.T
+
+def wavefunctions(hamiltonian=None, num_wfns=10,
+                  eigensolver='auto',
+                  initial_guess=None,
+                  potential_energy=None,
+                  grid_mask=None,
+                  dense_cutoff=1000,
+                  solver_options=None,
+                  **kw):
+    """
+    Computes the wavefunctions using one of a few eigensolver strategies
+
+    :param hamiltonian: the Hamiltonian matrix
+    :type hamiltonian: sp.spmatrix
+    :param num_wfns: the number of wavefunctions to compute
+    :type num_wfns: int
+    :param eigensolver: one of 'dense', 'shift-invert', 'lobpcg', 'sparse', or 'auto' (dense for small grids, 'sparse' otherwise)
+    :type eigensolver: str
+    :param initial_guess: warm-start subspace, e.g. the `DVR.Results` from a previous point in a scan
+    :type initial_guess:
+    :param potential_energy: the potential, used to place the shift for shift-invert
+    :type potential_energy:
+    :param grid_mask: the mask used to prune the grid, if any
+    :type grid_mask: np.ndarray | None
+    :param dense_cutoff: the grid size below which 'auto' uses dense diagonalization
+    :type dense_cutoff: int
+    :param solver_options: extra options passed through to the underlying solver
+    :type solver_options: dict | None
+    :return:
+    :rtype:
+    """
     import scipy.sparse.linalg as la
-    return la.eigsh(hamiltonian, num_wfns, which = 'SM')
+
+    npts = hamiltonian.shape[0]
+    num_wfns = min(num_wfns, npts)
+    if solver_options is None:
+        solver_options = {}
+    if initial_guess is not None:
+        initial_guess = _initial_guess(initial_guess, npts, grid_mask=grid_mask)
+
+    if eigensolver == 'auto':
+        eigensolver = 'dense' if npts <= dense_cutoff else 'sparse'
+
+    if eigensolver == 'dense':
+        h = hamiltonian.toarray() if sp.issparse(hamiltonian) else np.asarray(hamiltonian)
+        engs, wfns = np.linalg.eigh(h)
+        engs = engs[:num_wfns]
+        wfns = wfns[:, :num_wfns]
+    elif eigensolver == 'shift-invert':
+        if potential_energy is not None:
+            pot = np.asarray(potential_energy.diagonal()).flatten()
+            if grid_mask is not None:
+                pot = pot[grid_mask]
+            sigma = np.min(pot)
+        else:
+            sigma = np.min(hamiltonian.diagonal())
+        if initial_guess is not None and 'v0' not in solver_options:
+            solver_options = dict(solver_options, v0=initial_guess[:, 0])
+        engs, wfns = la.eigsh(hamiltonian.tocsc(), num_wfns, sigma=sigma, which='LM', **solver_options)
+    elif eigensolver == 'lobpcg':
+        diag = hamiltonian.diagonal()
+        shift = np.min(diag) - 1
+        precond = sp.diags([1/(diag - shift)], [0])
+        if initial_guess is None:
+            guess = np.random.rand(npts, num_wfns)
+        else:
+            guess = initial_guess[:, :num_wfns]
+            if guess.shape[1] < num_wfns:
+                guess = np.concatenate([guess, np.random.rand(npts, num_wfns - guess.shape[1])], axis=1)
+        opts = dict(dict(maxiter=500), **solver_options)
+        engs, wfns = la.lobpcg(hamiltonian, guess, M=precond, largest=False, **opts)
+    elif eigensolver == 'sparse':
+        engs, wfns = la.eigsh(hamiltonian, num_wfns, which='SM', **solver_options)
+    else:
+        raise ValueError("unknown eigensolver '{}'".format(eigensolver))
+
+    sorting = np.argsort(engs)
+    return engs[sorting], wfns[:, sorting].T
 
 
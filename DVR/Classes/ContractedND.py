@@ -0,0 +1,252 @@
+"""
+Contracted (sequential diagonalization-truncation) DVR built on top of
+the direct-product Colbert and Miller DVR.
+
+The trailing `contracted_dims` coordinates are treated as "inner" coordinates.
+For every grid point of the remaining "outer" coordinates we diagonalize the
+inner Hamiltonian, keep the eigenvectors below `contraction_cutoff` (or the lowest
+`num_contracted` of them), and then build the final Hamiltonian in that contracted basis
+"""
+
+import numpy as np
+from . import ColbertMiller1D as cm1D
+from . import ColbertMillerND as cmND
+
+def grid(domain=None, divs=None, flavor='[-inf,inf]', **kw):
+    """
+    Uses the direct-product grid from the ND DVR
+
+    :param domain:
+    :type domain:
+    :param divs:
+    :type divs:
+    :param kw:
+    :type kw:
+    :return:
+    :rtype:
+    """
+    return cmND.grid(domain=domain, divs=divs, flavor=flavor, **kw)
+
+def kinetic_energy(grid=None, m=1, hb=1, flavor='[-inf,inf]', **kw):
+    """
+    Computes the 1D kinetic energies along each axis of the grid.
+    The contraction only ever needs these, so we never build the direct-product operator.
+
+    :param grid:
+    :type grid:
+    :param m:
+    :type m:
+    :param hb:
+    :type hb:
+    :param flavor:
+    :type flavor:
+    :param kw:
+    :type kw:
+    :return:
+    :rtype: list[np.ndarray]
+    """
+
+    ndim = grid.shape[-1]
+    try:
+        iter(m); ms = m
+    except TypeError:
+        ms = [m]*ndim
+
+    try:
+        iter(hb); hbs = hb
+    except TypeError:
+        hbs = [hb]*ndim
+
+    grids = [
+        grid[(0, )*i + (...,) + (0, ) * (ndim-i-1) +(i,)]
+        for i in range(ndim)
+    ]
+    return [cm1D.kinetic_energy(subg, m=m, hb=hb, flavor=flavor) for subg, m, hb in zip(grids, ms, hbs)]
+
+def potential_energy(grid=None, potential_function=None, potential_values=None, potential_grid=None, **kw):
+    return cmND.potential_energy(grid=grid, potential_function=potential_function, potential_values=potential_values,
+                                 potential_grid=potential_grid, **kw)
+
+def _kron_sum(kes):
+    """
+    Dense Kronecker sum of a set of 1D operators
+    """
+    op = kes[0]
+    for b in kes[1:]:
+        n_1 = op.shape[0]
+        n_2 = b.shape[0]
+        op = np.kron(op, np.eye(n_2)) + np.kron(np.eye(n_1), b)
+    return op
+
+class ContractedHamiltonian:
+    """
+    The Hamiltonian in the contracted basis along with the inner eigenvectors
+    needed to map contracted wavefunctions back onto the full grid
+    """
+    def __init__(self, matrix, vectors, owners, outer_shape, inner_shape):
+        """
+        :param matrix: Hamiltonian in the contracted basis
+        :type matrix: np.ndarray
+        :param vectors: the inner eigenvectors kept for each outer grid point, stacked along the columns
+        :type vectors: np.ndarray
+        :param owners: the outer grid point each contracted basis function belongs to
+        :type owners: np.ndarray
+        :param outer_shape: shape of the outer grid
+        :type outer_shape: tuple[int]
+        :param inner_shape: shape of the inner grid
+        :type inner_shape: tuple[int]
+        """
+        self.matrix = matrix
+        self.vectors = vectors
+        self.owners = owners
+        self.outer_shape = outer_shape
+        self.inner_shape = inner_shape
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    def expand(self, coeffs):
+        """
+        Expands contracted-basis coefficients back onto the full direct-product grid
+
+        :param coeffs: coefficients, one wavefunction per row
+        :type coeffs: np.ndarray
+        :return: wavefunctions over the flattened full grid, one per row
+        :rtype: np.ndarray
+        """
+
+        n_outer = int(np.prod(self.outer_shape))
+        n_inner = int(np.prod(self.inner_shape))
+        full = np.zeros((coeffs.shape[0], n_outer, n_inner))
+        starts = np.searchsorted(self.owners, np.arange(n_outer + 1))
+        for j in range(n_outer):
+            s, e = starts[j], starts[j+1]
+            if e > s:
+                full[:, j] = coeffs[:, s:e] @ self.vectors[:, s:e].T
+        return full.reshape((coeffs.shape[0], n_outer * n_inner))
+
+def _inner_solve(ke, pot, cutoff, num, mask=None):
+    """
+    Diagonalizes a single inner Hamiltonian and truncates its spectrum.
+    If a `mask` is passed, the problem is solved on the surviving inner points only and
+    the kept eigenvectors are padded back out with zeros over the full inner grid
+    """
+    if mask is not None:
+        if not mask.any():
+            return np.zeros(0), np.zeros((len(mask), 0))
+        ke = ke[np.ix_(mask, mask)]
+        pot = pot[mask]
+    engs, vecs = np.linalg.eigh(ke + np.diag(pot))
+    if cutoff is not None:
+        keep = np.sum(engs < cutoff)
+        if num is not None:
+            keep = min(keep, num)
+    else:
+        keep = num
+    engs, vecs = engs[:keep], vecs[:, :keep]
+    if mask is not None:
+        full = np.zeros((len(mask), vecs.shape[1]), dtype=vecs.dtype)
+        full[mask] = vecs
+        vecs = full
+    return engs, vecs
+
+def hamiltonian(grid=None,
+                kinetic_energy=None,
+                potential_energy=None,
+                contracted_dims=None,
+                contraction_cutoff=None,
+                num_contracted=None,
+                num_workers=None,
+                grid_mask=None,
+                **kw):
+    """
+    Builds the Hamiltonian in the contracted basis.
+    If a `grid_mask` is passed, each inner problem only sees the grid points that survive it
+
+    :param grid: the direct-product grid
+    :type grid: np.ndarray
+    :param kinetic_energy: the 1D kinetic energies for each axis
+    :type kinetic_energy: list[np.ndarray]
+    :param potential_energy: the potential over the grid
+    :type potential_energy:
+    :param contracted_dims: the number of trailing coordinates to contract over (defaults to all but the first)
+    :type contracted_dims: int
+    :param contraction_cutoff: the energy below which inner eigenvectors are kept
+    :type contraction_cutoff: float
+    :param num_contracted: the maximum number of inner eigenvectors kept per outer grid point
+    :type num_contracted: int
+    :param num_workers: the number of threads to use for the inner diagonalizations
+    :type num_workers: int
+    :param grid_mask: the mask used to prune the grid, if any
+    :type grid_mask: np.ndarray | None
+    :return:
+    :rtype: ContractedHamiltonian
+    """
+
+    if contraction_cutoff is None and num_contracted is None:
+        raise ValueError("contracted DVR needs either a `contraction_cutoff` or `num_contracted`")
+
+    ndim = grid.shape[-1]
+    if contracted_dims is None:
+        contracted_dims = ndim - 1
+    if contracted_dims < 1 or contracted_dims >= ndim:
+        raise ValueError("number of contracted dimensions ({}) must be between 1 and {}".format(contracted_dims, ndim - 1))
+
+    outer_shape = grid.shape[:ndim - contracted_dims]
+    inner_shape = grid.shape[ndim - contracted_dims:-1]
+    n_outer = int(np.prod(outer_shape))
+    n_inner = int(np.prod(inner_shape))
+
+    ke_outer = _kron_sum(kinetic_energy[:ndim - contracted_dims])
+    ke_inner = _kron_sum(kinetic_energy[ndim - contracted_dims:])
+    pots = np.asarray(potential_energy.diagonal()).reshape((n_outer, n_inner))
+    if grid_mask is not None:
+        masks = np.asarray(grid_mask).reshape((n_outer, n_inner))
+    else:
+        masks = [None] * n_outer
+
+    if num_workers is not None and num_workers > 1:
+        # LAPACK releases the GIL so threads give us real parallelism here
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            solves = list(executor.map(
+                lambda pm: _inner_solve(ke_inner, pm[0], contraction_cutoff, num_contracted, mask=pm[1]),
+                zip(pots, masks)
+            ))
+    else:
+        solves = [_inner_solve(ke_inner, p, contraction_cutoff, num_contracted, mask=m) for p, m in zip(pots, masks)]
+
+    engs = np.concatenate([s[0] for s in solves])
+    if len(engs) == 0:
+        raise ValueError("contraction cutoff {} removes every inner state".format(contraction_cutoff))
+    vecs = np.concatenate([s[1] for s in solves], axis=1)
+    owners = np.concatenate([np.full(len(s[0]), j, dtype=int) for j, s in enumerate(solves)])
+
+    # <j a|T_outer|j' b> = T_outer[j, j'] <a_j|b_j'> and the inner part is diagonal by construction
+    # we fill this in one block row at a time so that no other (K, K) intermediates are needed
+    starts = np.searchsorted(owners, np.arange(n_outer + 1))
+    mat = np.empty((len(engs), len(engs)))
+    for j in range(n_outer):
+        s, e = starts[j], starts[j+1]
+        if e > s:
+            block = vecs[:, s:e].T @ vecs[:, s:]
+            block *= ke_outer[j, owners[s:]][np.newaxis]
+            mat[s:e, s:] = block
+            mat[s:, s:e] = block.T
+    mat[np.diag_indices_from(mat)] += engs
+
+    return ContractedHamiltonian(mat, vecs, owners, outer_shape, inner_shape)
+
+def wavefunctions(hamiltonian=None, num_wfns=10, grid_mask=None, **kw):
+    """
+    Diagonalizes the contracted Hamiltonian and expands the wavefunctions onto the full grid
+    (or onto the surviving grid points when a `grid_mask` is passed, matching the other DVRs)
+    """
+    engs, wfns = np.linalg.eigh(hamiltonian.matrix)
+    engs = engs[:num_wfns]
+    wfns = wfns[:, :num_wfns].T
+    wfns = hamiltonian.expand(wfns)
+    if grid_mask is not None:
+        wfns = wfns[:, grid_mask]
+    return engs, wfns
@@ -1,24 +1,104 @@
-import os, numpy as np
+import os, sys, hashlib, importlib, importlib.util, numpy as np
 
 class DVR:
     '''
     This is a manager class for working with DVRs.
-    It uses files from which it loads the spec data and methods, which are placed in the `Classes` subfolder.
+    It loads the spec data and methods from DVR class modules which are looked up in a registry.
+    The built-in classes are placed in the `Classes` subpackage, others can be added with `DVR.register`
+    or exposed by other packages through the `psience.dvr` entry point group.
     '''
 
     loaded_DVRs = {}  # for storing DVRs loaded from file
     dvr_dir = os.path.join(os.path.dirname(__file__), "Classes")
+    dvr_package = __package__ + ".Classes"
+    entry_point_group = "psience.dvr"
+    registry = {
+        "ColbertMiller1D": dvr_package + ".ColbertMiller1D",
+        "ColbertMillerND": dvr_package + ".ColbertMillerND",
+        "ContractedND": dvr_package + ".ContractedND"
+    }
 
     def __init__(self, dvr_file="ColbertMiller1D", **kwargs):
 
         self.params = kwargs  # these are the global parameters passed to all methods
-        if dvr_file is None:
-            self._dvr = None
+        self._grid_interpolator = None
+        if 'potential_grid' in self.params:
+            # build the interpolator once so that reruns with different grids can reuse it
+            self.params['potential_grid'] = self._potential_interpolator(self.params['potential_grid'])
+        self.dvr_spec = dvr_file
+        self._dvr_env = None
+
+    def _potential_interpolator(self, potential_grid):
+        """
+        Wraps `potential_grid` data in a `PotentialInterpolator`, reusing the last one built if it's for the same data
+        """
+        from .Interpolation import PotentialInterpolator
+        if isinstance(potential_grid, PotentialInterpolator):
+            return potential_grid
+        if self._grid_interpolator is None or self._grid_interpolator[0] is not potential_grid:
+            self._grid_interpolator = (potential_grid, PotentialInterpolator(potential_grid))
+        return self._grid_interpolator[1]
+
+    @property
+    def _dvr(self):
+        # DVR classes are only imported when we first need them
+        if self._dvr_env is None and self.dvr_spec is not None:
+            self._dvr_env = self.load_dvr(self.dvr_spec)
+        return self._dvr_env
+
+    def __getstate__(self):
+        # we only ship the spec so that worker processes can re-resolve the class themselves
+        return {'dvr_spec': self.dvr_spec, 'params': self.params}
+    def __setstate__(self, state):
+        self.dvr_spec = state['dvr_spec']
+        self.params = state['params']
+        self._dvr_env = None
+        self._grid_interpolator = None
+
+    @classmethod
+    def register(cls, name, module):
+        """
+        Registers a DVR class module under `name`
+
+        :param name: name of the DVR type
+        :type name: str
+        :param module: importable module name (or the module itself)
+        :type module: str | module
+        :return:
+        :rtype:
+        """
+        if not isinstance(module, str):
+            module = module.__name__
+        cls.registry[name] = module
+        cls.loaded_DVRs.pop(name, None)
+
+    @classmethod
+    def _entry_point_module(cls, name):
+        """
+        Looks `name` up in the `psience.dvr` entry point group
+
+        :param name: name of the DVR type
+        :type name: str
+        :return: module name or `None` if nothing is registered
+        :rtype: str | None
+        """
+        try:
+            from importlib.metadata import entry_points
+        except ImportError:
+            return None
+
+        eps = entry_points()
+        if hasattr(eps, 'select'):
+            eps = eps.select(group=cls.entry_point_group)
         else:
-            self._dvr = self.load_dvr(dvr_file)
+            eps = eps.get(cls.entry_point_group, [])
+        for ep in eps:
+            if ep.name == name:
+                return ep.value.split(":")[0]
+        return None
 
     @classmethod
-    def dvr_file(self, dvr):
+    def dvr_file(cls, dvr):
         """
         Locates the file used to initialize a DVR
 
@@ -31,13 +111,55 @@ class DVR:
         if os.path.exists(dvr):
             dvr_file = dvr
         else:
-            dvr_file = os.path.join(self.dvr_dir, dvr+".py")
+            dvr_file = os.path.join(cls.dvr_dir, dvr+".py")
 
         if not os.path.exists(dvr_file):
             raise DVRException("couldn't load DVR "+dvr)
 
         return dvr_file
 
+    @classmethod
+    def dvr_module(cls, dvr):
+        """
+        Imports the module that implements a DVR, checking the registry,
+        then the entry points, and finally treating `dvr` as a file path
+
+        :param dvr: name of the DVR type or file
+        :type dvr: str
+        :return:
+        :rtype: module
+        """
+
+        if dvr not in cls.registry:
+            mod_name = cls._entry_point_module(dvr)
+            if mod_name is not None:
+                cls.registry[dvr] = mod_name
+
+        if dvr in cls.registry:
+            return importlib.import_module(cls.registry[dvr])
+
+        dvr_file = os.path.abspath(cls.dvr_file(dvr))
+        # files get loaded as members of the `Classes` package so that they can
+        # use relative imports to build off of the built-in DVRs, under a name keyed
+        # by the path so that they never shadow a built-in class module
+        mod_name = "{}._file_{}_{}".format(
+            cls.dvr_package,
+            os.path.splitext(os.path.basename(dvr_file))[0],
+            hashlib.sha1(dvr_file.encode()).hexdigest()[:12]
+        )
+        if mod_name in sys.modules:
+            return sys.modules[mod_name]
+        importlib.import_module(cls.dvr_package)
+        spec = importlib.util.spec_from_file_location(mod_name, dvr_file)
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[mod_name] = mod
+        try:
+            spec.loader.exec_module(mod)
+        except:
+            del sys.modules[mod_name]
+            raise
+        return mod
+
     @classmethod
     def _load_env(cls, file, env):
         """
@@ -50,7 +172,7 @@ class DVR:
 
         cls.loaded_DVRs[file] = env
         for k in ('grid', 'kinetic_energy', 'potential_energy', 'hamiltonian', 'wavefunctions'):
-            if 'grid' not in env:
+            if k not in env:
                 raise DVRException("{}.{}: DVR class '{}' didn't export property '{}' (in file {})".format(
                     cls.__name__,
                     'load_dvr',
@@ -62,46 +184,43 @@ class DVR:
         return env
 
     @classmethod
-    def load_dvr(self, dvr):
+    def load_dvr(cls, dvr):
         """
-        Loads a DVR object from a class file or name
+        Loads a DVR object from a class name or file
 
         :param dvr: file or DVR name
         :type dvr: str
-        :return: new DVR instance
-        :rtype: DVR
+        :return: the properties exported by the DVR class
+        :rtype: dict
         """
 
-        dvr_file = self.dvr_file(dvr)
-        if dvr_file not in self.loaded_DVRs:
+        if dvr not in cls.loaded_DVRs:
+            mod = cls.dvr_module(dvr)
             # defaults and parameters passed as global
-            dvr_class = os.path.splitext(os.path.basename(dvr_file))[0]
             _load_env = {
-                'DVR': self,
-                'class': dvr_class,
-                'file': dvr_file,
-                'potential_energy': self._potential_energy,
-                'hamiltonian': self._hamiltonian,
-                'wavefunctions': self._wavefunctions
+                'DVR': cls,
+                'class': (
+                    os.path.splitext(os.path.basename(mod.__file__))[0]
+                    if getattr(mod, '__file__', None) is not None else
+                    mod.__name__.split(".")[-1]
+                ),
+                'file': getattr(mod, '__file__', None),
+                'potential_energy': cls._potential_energy,
+                'grid_mask': cls._grid_mask,
+                'hamiltonian': cls._hamiltonian,
+                'wavefunctions': cls._wavefunctions
                 }
+            exports = getattr(mod, '__all__', None)
+            if exports is None:
+                exports = [k for k in vars(mod) if not k.startswith("_")]
+            for k in exports:
+                _load_env[k] = getattr(mod, k)
 
-            import sys
-
-            dvr_dir = os.path.dirname(dvr_file)
-            sys.path.insert(0, os.path.dirname(dvr_dir))
-            sys.path.insert(0, dvr_dir)
-            try:
-                exec("from .Classes.{} import *".format(dvr_class), globals(), _load_env)
-            except ImportError:
-                exec("from .Classes.{} import *".format(dvr_class), globals(), _load_env)
-            finally:  # want to preserve error handling but still close the file
-                sys.path.pop(0)
-
-            load = self._load_env(dvr_file, _load_env)
+            load = cls._load_env(dvr, _load_env)
 
         else:
 
-            load = self.loaded_DVRs[dvr_file]
+            load = cls.loaded_DVRs[dvr]
 
         return load
 
@@ -164,6 +283,13 @@ class DVR:
         """
         return self._dvr_prop('potential_energy')
 
+    def grid_mask(self):
+        """
+        :return: the mask of grid points that survive the `potential_cutoff`
+        :rtype: np.ndarray
+        """
+        return self._dvr_prop('grid_mask')
+
     def hamiltonian(self):
         """
         :return: the total Hamiltonian matrix
@@ -194,6 +320,8 @@ class DVR:
 
         pe = self.potential_energy()
         self.params['potential_energy'] = pe
+        if 'potential_cutoff' in self.params and self.params['potential_cutoff'] is not None:
+            self.params['grid_mask'] = self.grid_mask()
         if self.params['result'] == 'potential_energy':
             return get_res()
 
@@ -208,6 +336,8 @@ class DVR:
             return get_res()
 
         energies, wfn_data = self.wavefunctions()
+        if 'grid_mask' in self.params:
+            wfn_data = self._scatter_wavefunctions(wfn_data, self.params['grid_mask'])
         self.params['wavefunctions'] = DVRWavefunctions(energies=energies, wavefunctions=wfn_data, **self.params)
         if self.params['result'] == 'wavefunctions':
             return get_res()
@@ -227,6 +357,8 @@ class DVR:
         try:
             if 'result' not in self.params:
                 self.params['result'] = 'wavefunctions'
+            if 'potential_grid' in runpars:
+                runpars = dict(runpars, potential_grid=self._potential_interpolator(runpars['potential_grid']))
             self.params.update(runpars)
             res = self._run()
         finally:
@@ -267,50 +399,93 @@ class DVR:
             # array of potential values at coords passed
             pot = np.diag(pars['potential_values'])
         elif 'potential_grid' in pars:
-            # TODO: extend to include ND, scipy.griddata
-            import scipy.interpolate as interp, scipy.sparse as sp
-
-            dim = len(pars['grid'].shape)
-            if dim > 1:
-                dim -= 1
+            import scipy.sparse as sp
+            from .Interpolation import PotentialInterpolator
 
-            if dim == 1:
-                interpolator = lambda g1, g2: interp.interp1d(g1[:, 0], g1[:, 1], kind='cubic')(g2)
-            else:
-                def interpolator(g, g2):
-                    # g is an np.ndarray of potential points and values
-                    # g2 is the set of grid points to interpolate them over
-
-                    shape_dim = len(g.shape)
-                    if shape_dim == 2:
-                        points = g[:, :-1]
-                        vals = g[:, -1]
-                        return interp.griddata(points, vals, g2)
-                    else:
-                        # assuming regular structured grid
-                        mesh = g.transpose(np.roll(np.arange(len(g.shape)), 1))
-                        points = tuple(np.unique(x) for x in mesh[:-1])
-                        vals = mesh[-1]
-                        return interp.interpn(points, vals, g2)
-            interp_vals = interpolator(pars['potential_grid'], pars['grid']).flatten()
+            interpolator = pars['potential_grid']
+            if not isinstance(interpolator, PotentialInterpolator):
+                interpolator = PotentialInterpolator(interpolator)
+            interp_vals = interpolator(pars['grid'])
             pot = sp.diags([interp_vals], [0])
         else:
             raise DVRException("couldn't construct potential matrix")
 
         return pot
 
+    @staticmethod
+    def _grid_mask(**pars):
+        """
+        A default grid pruning implementation for reuse.
+        Drops every grid point where the potential is above `potential_cutoff`
+
+        :param pars: parameters; important keys are potential_energy and potential_cutoff
+        :type pars:
+        :return: boolean mask over the flattened grid points
+        :rtype: np.ndarray
+        """
+
+        pot = np.asarray(pars['potential_energy'].diagonal()).flatten()
+        mask = pot < pars['potential_cutoff']
+        if not mask.any():
+            raise DVRException("potential cutoff {} removes every grid point".format(pars['potential_cutoff']))
+        return mask
+
+    @staticmethod
+    def _restrict_operator(op, mask):
+        """
+        Restricts an operator matrix to the grid points picked out by `mask`
+
+        :param op: dense or sparse operator over the full grid
+        :type op: np.ndarray | sp.spmatrix
+        :param mask: boolean mask over the flattened grid points
+        :type mask: np.ndarray
+        :return:
+        :rtype: np.ndarray | sp.spmatrix
+        """
+        import scipy.sparse as sp
+
+        if sp.issparse(op):
+            inds = np.where(mask)[0]
+            return op.tocsr()[inds][:, inds]
+        else:
+            return np.asarray(op)[np.ix_(mask, mask)]
+
+    @staticmethod
+    def _scatter_wavefunctions(wfns, mask):
+        """
+        Scatters wavefunctions computed on a pruned grid back onto the full grid
+        so that they can be plotted and integrated like any other DVR wavefunction
+
+        :param wfns: wavefunctions over the surviving grid points, one per row
+        :type wfns: np.ndarray
+        :param mask: boolean mask over the flattened grid points
+        :type mask: np.ndarray
+        :return:
+        :rtype: np.ndarray
+        """
+
+        full = np.zeros((wfns.shape[0], len(mask)), dtype=wfns.dtype)
+        full[:, mask] = wfns
+        return full
+
     @staticmethod
     def _hamiltonian(**pars):
         """
-        A default Hamiltonian matrix implementation for reuse
+        A default Hamiltonian matrix implementation for reuse.
+        If a `grid_mask` has been computed, the kinetic and potential energies are
+        restricted to the surviving grid points before they are added
 
-        :param pars: parameters; important keys are kinetic_energy and potential_energy
+        :param pars: parameters; important keys are kinetic_energy, potential_energy, and grid_mask
         :type pars:
         :return: Hamiltonian matrix
         :rtype: np.ndarray
         """
         ke = pars['kinetic_energy'] #type:np.ndarray
         pe = pars['potential_energy']  #type:np.ndarray
+        if 'grid_mask' in pars and pars['grid_mask'] is not None:
+            mask = pars['grid_mask']
+            ke = DVR._restrict_operator(ke, mask)
+            pe = DVR._restrict_operator(pe, mask)
         return ke + pe
 
     @staticmethod
@@ -339,6 +514,7 @@ class DVR:
                      potential_energy = None,
                      hamiltonian = None,
                      wavefunctions = None,
+                     grid_mask = None,
                      parent = None,
                      **opts
                      ):
@@ -347,6 +523,8 @@ class DVR:
             self.grid = grid
             self.kinetic_energy = kinetic_energy
             self.potential_energy = potential_energy
+            self.hamiltonian = hamiltonian
+            self.grid_mask = grid_mask
             self.parent = parent
             self.wavefunctions = wavefunctions
             self.opts = opts
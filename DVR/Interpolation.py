@@ -0,0 +1,93 @@
+"""
+Provides a reusable interpolator for `potential_grid` data so that the
+expensive setup (triangulations, spline coefficients, RBF weights) only happens once per dataset
+"""
+
+import numpy as np
+
+__all__ = [
+    "PotentialInterpolator"
+]
+
+class PotentialInterpolator:
+    """
+    Wraps up potential data in the same formats accepted by the `potential_grid` DVR parameter
+        1) an (n, 2) array of points and values for a 1D potential
+        2) an (n, d+1) array of scattered points and values for an ND potential
+        3) an (n_1, ..., n_d, d+1) structured mesh of points and values
+    and builds the underlying scipy interpolator once so that it can be evaluated on any DVR grid
+    """
+
+    def __init__(self, potential_grid, method=None, fill_value=np.nan, **interpolator_options):
+        """
+        :param potential_grid: the potential points and values
+        :type potential_grid: np.ndarray
+        :param method: the interpolation method; 'cubic' for 1D data, 'linear' otherwise, with 'rbf' and 'nearest' supported for scattered data
+        :type method: str | None
+        :param fill_value: the value used outside the convex hull of scattered data (structured meshes raise on points outside the mesh unless `bounds_error=False` is passed)
+        :type fill_value: float
+        :param interpolator_options: extra options for the underlying scipy interpolator
+        :type interpolator_options:
+        """
+
+        data = np.asarray(potential_grid)
+        if data.ndim < 2 or data.shape[-1] < 2:
+            raise ValueError("potential grid with shape {} isn't a set of points and values".format(data.shape))
+
+        if data.ndim == 2:
+            self.kind = "1D" if data.shape[1] == 2 else "scattered"
+        else:
+            self.kind = "structured"
+        if method is None:
+            method = 'cubic' if self.kind == "1D" else 'linear'
+        self.method = method
+        self.fill_value = fill_value
+        self.opts = interpolator_options
+        self.dimension = data.shape[-1] - 1
+        self._interp = self._build(data)
+
+    def _build(self, data):
+        import scipy.interpolate as interp
+
+        method = self.method
+        if self.kind == "1D":
+            return interp.interp1d(data[:, 0], data[:, 1], kind=method, **self.opts)
+        elif self.kind == "scattered":
+            points = data[:, :-1]
+            vals = data[:, -1]
+            if method == 'linear':
+                # triangulates once so repeat evaluations skip the Delaunay step in `griddata`
+                return interp.LinearNDInterpolator(points, vals, fill_value=self.fill_value, **self.opts)
+            elif method == 'nearest':
+                return interp.NearestNDInterpolator(points, vals, **self.opts)
+            elif method == 'cubic':
+                if self.dimension != 2:
+                    raise ValueError("cubic interpolation of scattered data is only supported in 2D")
+                return interp.CloughTocher2DInterpolator(points, vals, fill_value=self.fill_value, **self.opts)
+            elif method == 'rbf':
+                return interp.RBFInterpolator(points, vals, **self.opts)
+            else:
+                raise ValueError("unknown interpolation method '{}' for scattered data".format(method))
+        else:
+            # assuming regular structured grid
+            mesh = data.transpose(np.roll(np.arange(data.ndim), 1))
+            points = tuple(np.unique(x) for x in mesh[:-1])
+            vals = mesh[-1]
+            opts = dict(dict(bounds_error=True, fill_value=self.fill_value), **self.opts)
+            return interp.RegularGridInterpolator(points, vals, method=method, **opts)
+
+    def __call__(self, grid):
+        """
+        Evaluates the potential over a DVR grid
+
+        :param grid: a 1D grid or a mesh of ND points
+        :type grid: np.ndarray
+        :return: the potential values over the flattened grid
+        :rtype: np.ndarray
+        """
+
+        grid = np.asarray(grid)
+        if self.kind == "1D":
+            return self._interp(grid).flatten()
+        pts = grid.reshape((-1, grid.shape[-1]))
+        return np.asarray(self._interp(pts)).flatten()
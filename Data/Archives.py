@@ -0,0 +1,95 @@
+"""
+Provides a light-weight binary archive format built on uncompressed `.npz` files.
+Since the archive members are stored without compression, large arrays can be memory-mapped
+straight out of the archive instead of being read into memory up front.
+"""
+
+import os, zipfile, struct, numpy as np
+
+__all__ = [
+    "NumpyArchive"
+]
+
+class NumpyArchive:
+    """
+    A read-only view of an uncompressed `.npz` archive that memory-maps large members
+    """
+
+    mmap_threshold = 2**20 # arrays at least this many bytes get memory-mapped
+    def __init__(self, file, mmap=True, mmap_threshold=None):
+        """
+        :param file: archive file
+        :type file: str
+        :param mmap: whether to memory-map large arrays
+        :type mmap: bool
+        :param mmap_threshold: size in bytes above which arrays get memory-mapped
+        :type mmap_threshold: int | None
+        """
+        self.file = file
+        self.mmap = mmap
+        if mmap_threshold is not None:
+            self.mmap_threshold = mmap_threshold
+        with zipfile.ZipFile(file) as zf:
+            self._members = {os.path.splitext(z.filename)[0]: z for z in zf.infolist()}
+        self._cache = {}
+
+    @classmethod
+    def save(cls, file, **arrays):
+        """
+        Saves a set of arrays to an archive, skipping any that are `None`
+
+        :param file:
+        :type file: str
+        :param arrays:
+        :type arrays: np.ndarray
+        :return:
+        :rtype: str
+        """
+        arrays = {k: np.asarray(v) for k, v in arrays.items() if v is not None}
+        # np.savez never compresses, which is what lets us memory-map the members later
+        with open(file, 'wb') as out:
+            np.savez(out, **arrays)
+        return file
+
+    def keys(self):
+        return self._members.keys()
+    def __contains__(self, item):
+        return item in self._members
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        else:
+            return default
+    def __getitem__(self, key):
+        if key not in self._cache:
+            if key not in self._members:
+                raise KeyError("{}: archive {} has no array '{}'".format(
+                    type(self).__name__,
+                    self.file,
+                    key
+                ))
+            self._cache[key] = self._load(self._members[key])
+        return self._cache[key]
+
+    def _data_offset(self, f, info):
+        # the local file header is 30 bytes followed by the file name and extra field
+        f.seek(info.header_offset)
+        header = f.read(30)
+        name_len, extra_len = struct.unpack("<HH", header[26:30])
+        return info.header_offset + 30 + name_len + extra_len
+
+    def _load(self, info):
+        with open(self.file, 'rb') as f:
+            if self.mmap and info.compress_type == zipfile.ZIP_STORED and info.file_size >= self.mmap_threshold:
+                f.seek(self._data_offset(f, info))
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+                if not dtype.hasobject:
+                    return np.memmap(self.file, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                     order='F' if fortran else 'C')
+            with zipfile.ZipFile(f) as zf:
+                with zf.open(info) as member:
+                    return np.lib.format.read_array(member, allow_pickle=False)
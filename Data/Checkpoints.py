@@ -0,0 +1,132 @@
+"""
+Provides a cache of parsed Gaussian formatted checkpoint files so that all of the different
+loaders that pull from the same file (molecules, normal modes, potential and dipole surfaces) only parse it once
+"""
+
+import os, numpy as np
+from collections import OrderedDict
+
+__all__ = [
+    "FChkCache"
+]
+
+class FChkCache:
+    """
+    Caches the parsed blocks of formatted checkpoint files, keyed by path, modification time, and size.
+    The first request for a file parses the union of every block our loaders use in a single pass.
+    Since every caller gets the same parsed objects back, the arrays in them are made read-only.
+    """
+
+    prefetch_keys = (
+        'Coordinates', 'AtomicNumbers', 'Integer atomic weights', 'Real atomic weights',
+        'Total Energy', 'Gradient', 'ForceConstants', 'ForceDerivatives',
+        'VibrationalModes', 'VibrationalData',
+        'Dipole Moment', 'Dipole Derivatives'
+    )
+    core_keys = (
+        'Coordinates', 'AtomicNumbers', 'Integer atomic weights', 'Real atomic weights',
+        'Total Energy', 'Gradient', 'ForceConstants'
+    )
+    max_files = 8
+    _cache = OrderedDict()
+
+    @classmethod
+    def _file_key(cls, file):
+        path = os.path.abspath(file)
+        stats = os.stat(path)
+        return path, stats.st_mtime, stats.st_size
+
+    @classmethod
+    def _parse_file(cls, file, keys):
+        from McUtils.GaussianInterface import GaussianFChkReader
+
+        with GaussianFChkReader(file) as gr:
+            return gr.parse(list(keys))
+
+    @staticmethod
+    def _freeze(block):
+        # blocks are shared between callers, so nobody gets to write into them
+        if isinstance(block, np.ndarray):
+            block.flags.writeable = False
+        elif isinstance(block, dict):
+            for v in block.values():
+                if isinstance(v, np.ndarray):
+                    v.flags.writeable = False
+        elif hasattr(block, '__dict__'):
+            for v in vars(block).values():
+                if isinstance(v, np.ndarray):
+                    v.flags.writeable = False
+        return block
+
+    @classmethod
+    def parse(cls, file, keys):
+        """
+        Returns the requested blocks of `file`, parsing only the ones that haven't already been cached
+
+        :param file: formatted checkpoint file
+        :type file: str
+        :param keys: blocks to pull
+        :type keys: Iterable[str]
+        :return:
+        :rtype: dict
+        """
+
+        keys = tuple(keys)
+        file_key = cls._file_key(file)
+        path = file_key[0]
+        for k in [k for k in cls._cache if k[0] == path and k != file_key]:
+            del cls._cache[k] # file changed on disk so we drop stale data
+
+        if file_key in cls._cache:
+            blocks = cls._cache[file_key]
+            cls._cache.move_to_end(file_key)
+        else:
+            blocks = {}
+            cls._cache[file_key] = blocks
+            while len(cls._cache) > cls.max_files:
+                cls._cache.popitem(last=False)
+
+        missing = [k for k in keys if k not in blocks]
+        if len(missing) > 0:
+            if len(blocks) == 0:
+                # not every checkpoint file has every block we might like to prefetch
+                # so we fall back to smaller sets of blocks if the parse fails
+                attempts = [
+                    tuple(missing) + tuple(k for k in cls.prefetch_keys if k not in missing),
+                    tuple(missing) + tuple(k for k in cls.core_keys if k not in missing)
+                ]
+            else:
+                attempts = []
+            from McUtils.GaussianInterface.GaussianImporter import GaussianFChkReaderException
+            for prefetch in attempts:
+                try:
+                    parse = cls._parse_file(file, prefetch)
+                except GaussianFChkReaderException:
+                    pass # some block we tried to prefetch isn't in the file
+                else:
+                    break
+            else:
+                prefetch = missing
+                parse = cls._parse_file(file, prefetch)
+            for k in prefetch:
+                if k in parse:
+                    blocks[k] = cls._freeze(parse[k])
+
+        return {k: blocks[k] for k in keys}
+
+    @classmethod
+    def clear(cls, file=None):
+        """
+        Clears the cache for `file` or for everything if `file` is `None`
+
+        :param file:
+        :type file: str | None
+        :return:
+        :rtype:
+        """
+        if file is None:
+            cls._cache.clear()
+        else:
+            path = os.path.abspath(file)
+            for k in [k for k in cls._cache if k[0] == path]:
+                del cls._cache[k]
@@ -2,23 +2,178 @@
 Provides concrete tools for dealing with two of the most useful types of surfaces we have
 """
 
-import numpy as np
+import os, math, json, numpy as np
 from collections import namedtuple
-from McUtils.GaussianInterface import GaussianLogReader, GaussianFChkReader
+from McUtils.GaussianInterface import GaussianLogReader
 from McUtils.Zachary import Surface, MultiSurface, InterpolatedSurface, TaylorSeriesSurface
+from McUtils.Data import UnitsData
+from .Checkpoints import FChkCache
+from .Archives import NumpyArchive
 
 __all__=[
     "DipoleSurface",
-    "PotentialSurface"
+    "PotentialSurface",
+    "TaylorPotentialPlan"
 ]
 
+def _taylor_dipoles(gps, center, ref, derivs, out=None):
+    """
+    Evaluates all three components of a Taylor-expanded dipole surface together, sharing the displacements
+    (and the partial contractions with them) across the components
+
+    :param gps: (n, 3N) flattened coordinates
+    :type gps: np.ndarray
+    :param center: (3N,) expansion point
+    :type center: np.ndarray
+    :param ref: (3,) dipole at the expansion point
+    :type ref: np.ndarray
+    :param derivs: derivative tensors, (3N, 3), (3N, 3N, 3), ...
+    :type derivs: Iterable[np.ndarray]
+    :param out: (n, 3) array to write into
+    :type out: np.ndarray | None
+    :return:
+    :rtype: np.ndarray
+    """
+    n = len(gps)
+    if out is None:
+        out = np.empty((n, 3))
+    disp = gps - center[np.newaxis]
+    out[:] = ref[np.newaxis]
+    ncrd = disp.shape[1]
+    for k, d in enumerate(derivs):
+        term = disp @ d.reshape((ncrd, -1))
+        for _ in range(k):
+            term = np.einsum('ni,nir->nr', disp, term.reshape((n, ncrd, -1)))
+        out += term / math.factorial(k + 1)
+    return out
+
+def _evaluate_dipole_chunk(surf, gps, opts):
+    # module-level so that process pools can pickle it
+    return surf._evaluate_chunk(gps, None, opts)
+
+def _dedupe_scan(scan_coords, values, tol):
+    """
+    Sorts a scan and keeps the final point in every block of points whose coordinates agree to within `tol`
+    (which for optimization scans is the converged one)
+
+    :param scan_coords: (n,) or (n, k) scan coordinates
+    :type scan_coords: np.ndarray
+    :param values: (n, ...) values at the scan points
+    :type values: np.ndarray
+    :param tol:
+    :type tol: float
+    :return:
+    :rtype: (np.ndarray, np.ndarray)
+    """
+    scan_coords = np.asarray(scan_coords)
+    values = np.asarray(values)
+    if scan_coords.ndim == 1:
+        scan_sort = np.argsort(scan_coords, kind='stable')
+    else:
+        scan_sort = np.lexsort(tuple(reversed(tuple(scan_coords.T))))
+    scan_coords = scan_coords[scan_sort]
+    values = values[scan_sort]
+
+    tol_coords = np.floor(scan_coords/tol)
+    diffs = np.diff(tol_coords, axis=0) != 0
+    if diffs.ndim > 1:
+        diffs = np.any(diffs, axis=1)
+    # a point is the last of its block if the next one is in a different block
+    keep = np.append(diffs, True)
+    return scan_coords[keep], values[keep]
+
+def _parse_log_file(cls, log_file, keys):
+    # module-level so that process pools can pickle it
+    return tuple(cls.get_log_values(log_file, keys=keys))
+
+def _load_log_files(cls, log_files, keys, num_workers=None, cache=None):
+    """
+    Parses a set of log files, in a process pool when there's more than one, and merges their coordinates and values.
+    If a `cache` file is given, the merged data is written to it and reused on later calls
+    as long as it's newer than all of the log files.
+
+    :return:
+    :rtype: (np.ndarray, np.ndarray)
+    """
+    log_files = [os.path.abspath(f) for f in log_files]
+    if cache is not None and os.path.isfile(cache):
+        arch = NumpyArchive(cache)
+        if (
+                arch['files'].tolist() == log_files
+                and arch['keys'].tolist() == list(keys)
+                and os.path.getmtime(cache) >= max(os.path.getmtime(f) for f in log_files)
+        ):
+            return arch['coords'], arch['values']
+
+    if num_workers is None:
+        num_workers = min(len(log_files), os.cpu_count() or 1)
+    if num_workers > 1 and len(log_files) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            n = len(log_files)
+            parsed = list(executor.map(_parse_log_file, [cls]*n, log_files, [keys]*n))
+    else:
+        parsed = [_parse_log_file(cls, f, keys) for f in log_files]
+    coords = np.concatenate([np.asarray(p[0]) for p in parsed])
+    values = np.concatenate([np.asarray(p[1]) for p in parsed])
+
+    if cache is not None:
+        NumpyArchive.save(cache, files=np.array(log_files), keys=np.array(keys), coords=coords, values=values)
+    return coords, values
+
+def _save_surface(file, surf, scan_data=None, expansion=None, **extra):
+    """
+    Writes the data a surface was built from (scan coordinates and values or a Taylor expansion)
+    and the options it was built with to a `NumpyArchive`
+
+    :return:
+    :rtype: str
+    """
+    opts = surf.surface_options if surf.surface_options is not None else {}
+    try:
+        opts = json.dumps(opts)
+    except TypeError:
+        raise ValueError("{}: can't save surface options {}".format(type(surf).__name__, opts))
+    arrays = dict(surface_type=np.array(type(surf).__name__), options=np.array(opts), **extra)
+    if scan_data is not None:
+        arrays['scan_coords'], arrays['values'] = scan_data
+    elif expansion is not None:
+        center, ref, derivs = expansion
+        arrays['center'] = center
+        arrays['ref'] = ref
+        for i, d in enumerate(derivs):
+            arrays['deriv_{}'.format(i + 1)] = d
+    else:
+        raise ValueError("{}: surface has neither scan data nor an expansion to save".format(type(surf).__name__))
+    return NumpyArchive.save(file, **arrays)
+
+def _read_surface(cls, file, mmap=True):
+    """
+    Reads back the data written by `_save_surface`
+
+    :return: the archive, the surface options, the scan data, and the expansion
+    :rtype: (NumpyArchive, dict, tuple | None, tuple | None)
+    """
+    arch = NumpyArchive(file, mmap=mmap)
+    stype = str(arch['surface_type']) if 'surface_type' in arch else None
+    if stype != cls.__name__:
+        raise ValueError("{}: archive {} holds a {}, not a {}".format(cls.__name__, file, stype, cls.__name__))
+    opts = json.loads(str(arch['options']))
+    if 'scan_coords' in arch:
+        return arch, opts, (arch['scan_coords'], arch['values']), None
+    num_derivs = sum(1 for k in arch.keys() if k.startswith('deriv_'))
+    derivs = [arch['deriv_{}'.format(i + 1)] for i in range(num_derivs)]
+    return arch, opts, None, (arch['center'], arch['ref'], derivs)
+
 class DipoleSurface(MultiSurface):
     """
     Provides a unified interface to working with dipole surfaces.
     Currently basically no fancier than a regular surface (although with convenient loading functions), but dipole-specific
     stuff could come
     """
-    def __init__(self, mu_x, mu_y, mu_z):
+    scan_data = None
+    surface_options = None
+    def __init__(self, mu_x, mu_y, mu_z, expansion=None):
         """
 
         :param mu_x: X-component of dipole moment
@@ -27,7 +182,13 @@ class DipoleSurface(MultiSurface):
         :type mu_y: Surface
         :param mu_z: Z-component of dipole moment
         :type mu_z: Surface
+        :param expansion: the center, reference dipole, and (3N, ..., 3) derivative tensors of a Taylor expansion, which lets all three components be evaluated in one pass
+        :type expansion: (np.ndarray, np.ndarray, Iterable[np.ndarray]) | None
         """
+        if expansion is not None:
+            center, ref, derivs = expansion
+            expansion = (np.asarray(center).flatten(), np.asarray(ref), [np.asarray(d) for d in derivs])
+        self.expansion = expansion
         if isinstance(mu_x.base, TaylorSeriesSurface):
             self.mode = "taylor"
         else:
@@ -63,6 +224,42 @@ class DipoleSurface(MultiSurface):
         """
 
         carts, dipoles = cls.get_log_values(log_file, keys=keys)
+        return cls.from_scan_values(carts, dipoles, coord_transf, tol=tol, **opts)
+
+    @classmethod
+    def from_log_files(cls, log_files, coord_transf, keys=("StandardCartesianCoordinates", "DipoleMoments"), tol = .001,
+                       num_workers=None, cache=None, **opts):
+        """
+        Loads dipoles from a scan split over many Gaussian log files and builds a single dipole surface.
+        The files are parsed concurrently and the merged data can be cached to a binary file for reuse.
+
+        :param log_files: the Gaussian log files to pull from
+        :type log_files: Iterable[str]
+        :param num_workers: the number of processes to parse files with (defaults to one per file, up to the number of CPUs)
+        :type num_workers: int | None
+        :param cache: a `.npz` file to store the parsed data in
+        :type cache: str | None
+        :return:
+        :rtype: DipoleSurface
+        """
+
+        carts, dipoles = _load_log_files(cls, log_files, keys, num_workers=num_workers, cache=cache)
+        return cls.from_scan_values(carts, dipoles, coord_transf, tol=tol, **opts)
+
+    @classmethod
+    def from_scan_values(cls, carts, dipoles, coord_transf, tol = .001, **opts):
+        """
+        Builds a dipole surface by interpolating dipoles over the "scan" coordinates of a set of Cartesian configurations
+
+        :param carts: the Cartesian coordinates of the scan points
+        :type carts: np.ndarray
+        :param dipoles: (n, 3) dipoles at the scan points
+        :type dipoles: np.ndarray
+        :param coord_transf: a function that converts the Cartesian coordinates into scan coordinates
+        :type coord_transf: function
+        :return:
+        :rtype: DipoleSurface
+        """
 
         scan_coords = coord_transf(carts)
         if len(dipoles) != len(scan_coords):
@@ -73,41 +270,37 @@ class DipoleSurface(MultiSurface):
                 )
             )
 
-        if scan_coords.ndim == 1:
-            scan_sort = np.argsort(scan_coords)
-        else:
-            scan_sort = np.lexsort(tuple(reversed(tuple(scan_coords.T))))
-        scan_coords = scan_coords[scan_sort]
-        dipoles = dipoles[scan_sort]
-
-        # this is particularly relevant for optimization scans...but we pull all the "unique" indices
-        # then we pull the indices right _before_ each unique one since that's the final one in the block of "uniques"
-        # finally we do a "roll" to make sure the order from the sort is preserved
-        tol_coords = np.floor(scan_coords/tol)
-        if tol_coords.ndim == 1:
-            diffs = np.diff(tol_coords)
-        else:
-            diffs = np.sum(abs(np.diff(tol_coords, axis=0)), axis=1)
-        inds = np.where(diffs != 0)[0]
-        inds = np.concatenate((inds, [len(inds)]))
-        scan_coords = scan_coords[inds]
-        dipoles = dipoles[inds]
+        scan_coords, dipoles = _dedupe_scan(scan_coords, dipoles, tol)
+        return cls.from_scan_data(scan_coords, dipoles, **opts)
+
+    @classmethod
+    def from_scan_data(cls, scan_coords, dipoles, **opts):
+        """
+        Builds a dipole surface by interpolating dipoles over a set of (already deduplicated) scan coordinates
 
-        dipoles = list(np.transpose(dipoles))
+        :param scan_coords: the scan coordinates
+        :type scan_coords: np.ndarray
+        :param dipoles: (n, 3) dipoles at the scan points
+        :type dipoles: np.ndarray
+        :return:
+        :rtype: DipoleSurface
+        """
 
-        return DipoleSurface(*(
+        surf = cls(*(
             Surface(
                 ((scan_coords, d), opts),
                 base = InterpolatedSurface,
                 dipole_component = "x" if i == 0 else "y" if i == 1 else "z"
-            ) for i,d in enumerate(dipoles)
+            ) for i,d in enumerate(np.transpose(dipoles))
         ))
+        surf.scan_data = (scan_coords, dipoles)
+        surf.surface_options = opts
+        return surf
 
     @staticmethod
     def get_fchk_values(fchk_file):
 
-        with GaussianFChkReader(fchk_file) as parser:
-            parse_data = parser.parse(["Coordinates", "Dipole Moment", "Dipole Derivatives"])
+        parse_data = FChkCache.parse(fchk_file, ["Coordinates", "Dipole Moment", "Dipole Derivatives"])
 
         center = parse_data["Coordinates"]
         const_dipole = parse_data["Dipole Moment"]
@@ -127,32 +320,98 @@ class DipoleSurface(MultiSurface):
         """
 
         center, const_dipole, derivs = cls.get_fchk_values(fchk_file)
-        derivs = list(np.transpose(derivs))
+        return cls.from_expansion(center, const_dipole, [derivs], **opts)
 
-        opts['center'] = center.flatten()
+    @classmethod
+    def from_expansion(cls, center, const_dipole, derivs, **opts):
+        """
+        Builds a dipole surface from a Taylor expansion
+
+        :param center: the expansion point
+        :type center: np.ndarray
+        :param const_dipole: (3,) dipole at the expansion point
+        :type const_dipole: np.ndarray
+        :param derivs: derivative tensors, (3N, 3), (3N, 3N, 3), ...
+        :type derivs: Iterable[np.ndarray]
+        :return:
+        :rtype: DipoleSurface
+        """
+
+        surf_opts = opts
+        opts = dict(opts, center=np.asarray(center).flatten())
         surfs = [None]*3
-        for i, d in enumerate(zip(derivs, list(const_dipole))):
-            d, r = d
+        for i, r in enumerate(const_dipole):
             opts = opts.copy()
             opts["ref"] = r
             surfs[i] = Surface(
-                ((d,), opts),
+                (tuple(np.asarray(d)[..., i] for d in derivs), opts),
                 base = TaylorSeriesSurface,
                 dipole_component="x" if i == 0 else "y" if i == 1 else "z"
             )
 
-        return cls(*surfs)
+        surf = cls(*surfs, expansion=(center, const_dipole, derivs))
+        surf.surface_options = surf_opts
+        return surf
+
+    def save(self, file):
+        """
+        Saves the data the surface was built from to a binary archive that `DipoleSurface.load` can rebuild it from
+        without going back to the electronic structure output
+
+        :param file: the `.npz` file to write to
+        :type file: str
+        :return:
+        :rtype: str
+        """
+        return _save_surface(file, self, scan_data=self.scan_data, expansion=self.expansion)
+
+    @classmethod
+    def load(cls, file, mmap=True):
+        """
+        Loads a surface written by `DipoleSurface.save`, with the large arrays memory-mapped
 
-    def __call__(self, gridpoints, **opts):
+        :param file: the `.npz` file to read
+        :type file: str
+        :param mmap: whether to memory-map the large arrays
+        :type mmap: bool
+        :return:
+        :rtype: DipoleSurface
+        """
+        arch, opts, scan_data, expansion = _read_surface(cls, file, mmap=mmap)
+        if scan_data is not None:
+            return cls.from_scan_data(*scan_data, **opts)
+        else:
+            return cls.from_expansion(*expansion, **opts)
+
+    def _evaluate_chunk(self, gps, out, opts):
+        if self.expansion is not None:
+            return _taylor_dipoles(gps, *self.expansion, out=out)
+        res = super().__call__(gps, **opts)
+        if out is not None:
+            out[:] = res
+            res = out
+        return res
+
+    def __call__(self, gridpoints, chunk_size=None, num_workers=None, pool="threads", out=None, **opts):
         """
-        Explicitly overrides the Surface-level evaluation because we know the Taylor surface needs us to flatten our gridpoints
+        Explicitly overrides the Surface-level evaluation because we know the Taylor surface needs us to flatten our gridpoints.
+        Points can be streamed through in chunks of `chunk_size` configurations and those chunks can be handed off to a pool of
+        workers, with every chunk written straight into the (n, 3) output.
 
         :param gridpoints:
         :type gridpoints:
+        :param chunk_size: the number of configurations to evaluate at once (defaults to all of them)
+        :type chunk_size: int | None
+        :param num_workers: the number of workers to evaluate chunks over
+        :type num_workers: int | None
+        :param pool: whether to use `'threads'` or `'processes'` for the workers
+        :type pool: str
+        :param out: a preallocated, C-contiguous array with room for `3*n` values that the dipoles get written into
+        :type out: np.ndarray | None
         :param opts:
         :type opts:
-        :return:
-        :rtype:
+        :return: the dipoles, shaped like the batch axes of `gridpoints` (a view of `out` if it was passed)
+        :rtype: np.ndarray
         """
 
         gps = np.asarray(gridpoints)
@@ -160,9 +419,47 @@ class DipoleSurface(MultiSurface):
             if gps.ndim == 2:
                 gps = gps.flatten()
             elif gps.ndim > 2:
-                gps = np.reshape(gps, gps.shape[:-2] + (np.product(gps.shape[-2:]),))
+                gps = np.reshape(gps, gps.shape[:-2] + (np.prod(gps.shape[-2:], dtype=int),))
+
+        if self.expansion is None and chunk_size is None and out is None:
+            return super().__call__(gps, **opts)
+
+        if self.mode == "taylor":
+            # a single configuration keeps its leading axis, matching `MultiSurface.__call__`
+            extra_shape = gps.shape[:-1] if gps.ndim > 1 else (1,)
+            gps = gps.reshape((-1, gps.shape[-1]))
+        else:
+            extra_shape = (len(gps),)
+
+        n = len(gps)
+        if chunk_size is None:
+            chunk_size = max(n, 1)
+        bounds = [(s, min(s + chunk_size, n)) for s in range(0, n, chunk_size)]
+        if out is None:
+            out = np.empty((n, 3))
+        elif not out.flags.c_contiguous or out.size != 3 * n:
+            # anything else would make the reshape below a copy and the results would never reach `out`
+            raise ValueError("{}: `out` needs to be a C-contiguous array with room for {} dipoles".format(type(self).__name__, n))
+        res = out.reshape((n, 3))
+
+        if num_workers is not None and num_workers > 1 and len(bounds) > 1:
+            if pool == "processes":
+                from concurrent.futures import ProcessPoolExecutor
+                with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                    futures = [executor.submit(_evaluate_dipole_chunk, self, gps[s:e], opts) for s, e in bounds]
+                    for (s, e), f in zip(bounds, futures):
+                        res[s:e] = f.result()
+            elif pool == "threads":
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                    list(executor.map(lambda b: self._evaluate_chunk(gps[b[0]:b[1]], res[b[0]:b[1]], opts), bounds))
+            else:
+                raise ValueError("{}: pool should be 'threads' or 'processes', not '{}'".format(type(self).__name__, pool))
+        else:
+            for s, e in bounds:
+                self._evaluate_chunk(gps[s:e], res[s:e], opts)
 
-        return super().__call__(gps, **opts)
+        return res.reshape(extra_shape + (3,))
 
 class PotentialSurface(Surface):
     """
@@ -170,6 +467,13 @@ class PotentialSurface(Surface):
     Provides convenient access to dipole data + a unified interface to things like energy minimization
     """
 
+    expansion = None
+    source_file = None
+    scan_data = None
+    surface_options = None
+    _fchk_modes = None
+    _plans = None
+
     @staticmethod
     def get_log_values(log_file, keys=("StandardCartesianCoordinates", "ScanEnergies")):
 
@@ -201,10 +505,43 @@ class PotentialSurface(Surface):
         """
 
         dat = cls.get_log_values(log_file, keys=keys)
-        carts = dat.coords
-        pots = dat.energies
+        return cls.from_scan_values(dat.coords, dat.energies, coord_transf, tol=tol, **opts)
+
+    @classmethod
+    def from_log_files(cls, log_files, coord_transf, keys=("StandardCartesianCoordinates", "ScanEnergies"), tol = .001,
+                       num_workers=None, cache=None, **opts):
+        """
+        Loads energies from a scan split over many Gaussian log files and builds a single potential surface.
+        The files are parsed concurrently and the merged data can be cached to a binary file for reuse.
+
+        :param log_files: the Gaussian log files to pull from
+        :type log_files: Iterable[str]
+        :param num_workers: the number of processes to parse files with (defaults to one per file, up to the number of CPUs)
+        :type num_workers: int | None
+        :param cache: a `.npz` file to store the parsed data in
+        :type cache: str | None
+        :return:
+        :rtype: PotentialSurface
+        """
+
+        carts, pots = _load_log_files(cls, log_files, keys, num_workers=num_workers, cache=cache)
+        return cls.from_scan_values(carts, pots, coord_transf, tol=tol, **opts)
+
+    @classmethod
+    def from_scan_values(cls, carts, pots, coord_transf, tol = .001, **opts):
+        """
+        Builds a potential surface by interpolating energies over the "scan" coordinates of a set of Cartesian configurations
+
+        :param carts: the Cartesian coordinates of the scan points
+        :type carts: np.ndarray
+        :param pots: the energies at the scan points
+        :type pots: np.ndarray
+        :param coord_transf: a function that converts the Cartesian coordinates into scan coordinates
+        :type coord_transf: function
+        :return:
+        :rtype: PotentialSurface
+        """
 
-        # raise Exception(carts, pots)
         scan_coords = coord_transf(carts)
         if len(pots) != len(scan_coords):
             raise ValueError(
@@ -214,36 +551,34 @@ class PotentialSurface(Surface):
                 )
             )
 
-        if scan_coords.ndim == 1:
-            scan_sort = np.argsort(scan_coords)
-        else:
-            scan_sort = np.lexsort(tuple(reversed(tuple(scan_coords.T))))
-        scan_coords = scan_coords[scan_sort]
-        pots = pots[scan_sort]
-
-        # this is particularly relevant for optimization scans...but we pull all the "unique" indices
-        # then we pull the indices right _before_ each unique one since that's the final one in the block of "uniques"
-        # finally we do a "roll" to make sure the order from the sort is preserved
-        tol_coords = np.floor(scan_coords/tol)
-        if tol_coords.ndim == 1:
-            diffs = np.diff(tol_coords)
-        else:
-            diffs = np.sum(abs(np.diff(tol_coords, axis=0)), axis=1)
-        inds = np.where(diffs != 0)[0]
-        inds = np.concatenate((inds, [len(inds)]))
-        scan_coords = scan_coords[inds]
-        pots = pots[inds]
+        scan_coords, pots = _dedupe_scan(scan_coords, pots, tol)
+        return cls.from_scan_data(scan_coords, pots, **opts)
+
+    @classmethod
+    def from_scan_data(cls, scan_coords, pots, **opts):
+        """
+        Builds a potential surface by interpolating energies over a set of (already deduplicated) scan coordinates
 
-        return cls(
+        :param scan_coords: the scan coordinates
+        :type scan_coords: np.ndarray
+        :param pots: the energies at the scan points
+        :type pots: np.ndarray
+        :return:
+        :rtype: PotentialSurface
+        """
+
+        surf = cls(
                 ((scan_coords, pots), opts),
                 base=InterpolatedSurface
         )
+        surf.scan_data = (scan_coords, pots)
+        surf.surface_options = opts
+        return surf
 
     @staticmethod
     def get_fchk_values(fchk_file):
         # TODO: I know I probably didn't do this right but I'm just getting a thing out for now
-        with GaussianFChkReader(fchk_file) as parser:
-            parse_data = parser.parse(["Coordinates", "Total Energy", "Gradient", "ForceConstants", "ForceDerivatives"])
+        parse_data = FChkCache.parse(fchk_file, ["Coordinates", "Total Energy", "Gradient", "ForceConstants", "ForceDerivatives"])
 
         center = parse_data["Coordinates"]
         eng = parse_data["Total Energy"]
@@ -265,4 +600,309 @@ class PotentialSurface(Surface):
 
         center, energy, derivs = cls.get_fchk_values(fchk_file)
 
-        return cls((derivs, dict(ref=energy, center=center.flatten())), base=TaylorSeriesSurface, **opts)
\ No newline at end of file
+        surf = cls.from_expansion(center, energy, derivs, **opts)
+        surf.source_file = fchk_file
+        return surf
+
+    @classmethod
+    def from_expansion(cls, center, energy, derivs, **opts):
+        """
+        Builds a potential surface from a Taylor expansion.
+        The derivatives are unpacked into dense (gradient, force constants, cubic, quartic) arrays first,
+        so a surface built from fchk data and one loaded back from `save` get the same inputs.
+
+        :param center: the expansion point
+        :type center: np.ndarray
+        :param energy: the energy at the expansion point
+        :type energy: float
+        :param derivs: the potential derivatives
+        :type derivs: Iterable
+        :return:
+        :rtype: PotentialSurface
+        """
+        from ..Molecools.Molecule import Molecule
+
+        center = np.asarray(center).flatten()
+        derivs = Molecule._dense_potential_derivatives(derivs)
+        surf = cls((derivs, dict(ref=energy, center=center)), base=TaylorSeriesSurface, **opts)
+        surf.expansion = (center, energy, derivs)
+        surf.surface_options = opts
+        return surf
+
+    def save(self, file):
+        """
+        Saves the data the surface was built from to a binary archive that `PotentialSurface.load` can rebuild it from
+        without going back to the electronic structure output.
+
+        :param file: the `.npz` file to write to
+        :type file: str
+        :return:
+        :rtype: str
+        """
+        return _save_surface(
+            file, self,
+            scan_data=self.scan_data,
+            expansion=self.expansion,
+            source_file=None if self.source_file is None else np.array(self.source_file)
+        )
+
+    @classmethod
+    def load(cls, file, mmap=True):
+        """
+        Loads a surface written by `PotentialSurface.save`, with the large arrays memory-mapped
+
+        :param file: the `.npz` file to read
+        :type file: str
+        :param mmap: whether to memory-map the large arrays
+        :type mmap: bool
+        :return:
+        :rtype: PotentialSurface
+        """
+        arch, opts, scan_data, expansion = _read_surface(cls, file, mmap=mmap)
+        if scan_data is not None:
+            return cls.from_scan_data(*scan_data, **opts)
+        center, energy, derivs = expansion
+        surf = cls.from_expansion(center, float(energy), derivs, **opts)
+        if 'source_file' in arch:
+            surf.source_file = str(arch['source_file'])
+        return surf
+
+    def compile(self, modes=None, tol=0.):
+        """
+        Builds (and caches) a `TaylorPotentialPlan` for a surface loaded from an fchk file,
+        which evaluates the quartic expansion in normal mode coordinates much more cheaply than the
+        generic Cartesian Taylor series.
+        The masses and normal modes that the fchk derivatives are expressed in are read from `source_file` once
+        and kept on the surface.
+
+        :param modes: the coordinates to expand in (defaults to the normal modes stored in the fchk file)
+        :type modes: MolecularNormalModes | (np.ndarray, np.ndarray) | None
+        :param tol: the size below which cubic and quartic terms get dropped
+        :type tol: float
+        :return:
+        :rtype: TaylorPotentialPlan
+        """
+        if self.expansion is None:
+            raise ValueError("{}: only Taylor expansions loaded from fchk files can be compiled".format(type(self).__name__))
+        if self._fchk_modes is None:
+            if self.source_file is None:
+                raise ValueError(
+                    "{}: compiling needs the masses and normal modes from the fchk file the expansion came from, but no `source_file` is set".format(
+                        type(self).__name__
+                    )
+                )
+            from ..Molecools import Molecule
+            mol = Molecule.from_file(self.source_file)
+            self._fchk_modes = (np.asarray(mol.masses), mol.normal_modes.basis)
+        masses, fchk_modes = self._fchk_modes
+        if modes is None:
+            modes = fchk_modes
+        if self._plans is None:
+            self._plans = []
+        # we hold on to the modes themselves so a cached plan can never be handed back for a different set
+        for m, t, plan in self._plans:
+            if m is modes and t == tol:
+                return plan
+        center, energy, derivs = self.expansion
+        plan = TaylorPotentialPlan.from_derivatives(center, energy, derivs, masses, fchk_modes, modes=modes, tol=tol)
+        self._plans.append((modes, tol, plan))
+        return plan
+
+class TaylorPotentialPlan:
+    """
+    A quartic Taylor expansion of a potential that has been transformed once into a set of (linear) coordinates,
+    usually the normal modes, so that evaluating it at a batch of points
+    takes a handful of matrix products.
+    Only the unique, nonzero cubic and quartic terms are kept, which makes the semi-diagonal quartic
+    force fields we get from Gaussian cheap to evaluate.
+    """
+
+    def __init__(self, center, ref, inverse, gradient, hessian, cubic_terms=None, quartic_terms=None):
+        """
+        :param center: (3N,) expansion point
+        :type center: np.ndarray
+        :param ref: energy at the expansion point
+        :type ref: float
+        :param inverse: (m, 3N) matrix taking Cartesian displacements to the expansion coordinates
+        :type inverse: np.ndarray
+        :param gradient: (m,) gradient in the expansion coordinates
+        :type gradient: np.ndarray
+        :param hessian: (m, m) Hessian in the expansion coordinates
+        :type hessian: np.ndarray
+        :param cubic_terms: (indices, coefficients) for the unique cubic terms, with (k, 3) indices
+        :type cubic_terms: (np.ndarray, np.ndarray) | None
+        :param quartic_terms: (indices, coefficients) for the unique quartic terms, with (k, 4) indices
+        :type quartic_terms: (np.ndarray, np.ndarray) | None
+        """
+        self.center = np.asarray(center).flatten()
+        self.ref = ref
+        self.inverse = np.asarray(inverse)
+        self.gradient = np.asarray(gradient)
+        self.hessian = np.asarray(hessian)
+        self.cubic_terms = cubic_terms
+        self.quartic_terms = quartic_terms
+
+    @staticmethod
+    def _unique_terms(inds, values, tol):
+        """
+        Averages the values that share a multiset of indices and folds the number of
+        permutations and the Taylor prefactor (which together come to 1/prod(multiplicity!)) into the coefficients
+        """
+        inds = np.sort(inds, axis=1)
+        uniq, inv = np.unique(inds, axis=0, return_inverse=True)
+        inv = inv.flatten()
+        vals = np.bincount(inv, weights=values, minlength=len(uniq)) / np.bincount(inv, minlength=len(uniq))
+        # the running count of repeated indices along each sorted row multiplies out to prod(multiplicity!)
+        runs = np.ones(uniq.shape, dtype=int)
+        for p in range(1, uniq.shape[1]):
+            runs[:, p] = np.where(uniq[:, p] == uniq[:, p-1], runs[:, p-1] + 1, 1)
+        coeffs = vals / np.prod(runs, axis=1)
+        keep = np.abs(coeffs) > tol
+        if not keep.any():
+            return None
+        return uniq[keep], coeffs[keep]
+
+    @staticmethod
+    def _mode_jacobians(modes, masses):
+        """
+        Gets the Cartesian displacements per unit of each coordinate and the matrix taking Cartesian displacements back
+        to the coordinates. Normal modes are made dimensionless the same way `ExpansionTerms.undimensionalize` does it,
+        and Cartesian displacements are projected onto them in the mass-weighted metric so translations and rotations drop out.
+
+        :return: (3N, m) and (m, 3N) matrices
+        :rtype: (np.ndarray, np.ndarray)
+        """
+        if hasattr(modes, 'matrix'):
+            mat = np.asarray(modes.matrix) / np.sqrt(np.abs(np.asarray(modes.freqs)))[np.newaxis, :]
+            weights = np.sqrt(np.repeat(masses, 3))
+            inv = np.linalg.pinv(weights[:, np.newaxis] * mat) * weights[np.newaxis, :]
+        else:
+            mat, inv = [np.asarray(x) for x in modes]
+        return mat, inv
+
+    @classmethod
+    def from_derivatives(cls, center, ref, derivs, masses, deriv_modes, modes=None, tol=0.):
+        """
+        Transforms potential derivatives in the layout `PotentialTerms` uses
+        (Cartesian gradient and force constants, (k, 3N, 3N) cubics and (k, k, 3N, 3N) semi-diagonal quartics
+        with their leading axes in the `k` normal modes the derivatives came with) into the coordinates of `modes`.
+        The leading mode axes are made dimensionless with the same factors as `PotentialTerms._canonicalize_derivs`
+        and the cubics are carried over to `modes` through the overlap of the two sets of coordinates.
+        Since only the semi-diagonal quartics are known, quartic terms can only be kept
+        when `modes` is a subset of `deriv_modes`.
+
+        :param center:
+        :type center: np.ndarray
+        :param ref:
+        :type ref: float
+        :param derivs:
+        :type derivs: Iterable
+        :param masses: the atomic masses, in amu
+        :type masses: np.ndarray
+        :param deriv_modes: the normal modes the leading axes of the cubic and quartic derivatives are in
+        :type deriv_modes: MolecularNormalModes
+        :param modes: the coordinates to expand in, either normal modes or a ((3N, m), (m, 3N)) pair of matrices (defaults to `deriv_modes`)
+        :type modes: MolecularNormalModes | (np.ndarray, np.ndarray) | None
+        :param tol: the size below which cubic and quartic terms get dropped
+        :type tol: float
+        :return:
+        :rtype: TaylorPotentialPlan
+        """
+        from ..Molecools.Molecule import Molecule
+
+        masses = np.asarray(masses) * UnitsData.convert("AtomicMassUnits", "AtomicUnitOfMass")
+        if modes is None:
+            modes = deriv_modes
+        mat, inv = cls._mode_jacobians(modes, masses)
+        derivs = Molecule._dense_potential_derivatives(derivs)
+        m = mat.shape[1]
+
+        grad = mat.T @ derivs[0]
+        hess = mat.T @ derivs[1] @ mat
+
+        has_cubics = len(derivs) > 2 and derivs[2] is not None
+        has_quartics = len(derivs) > 3 and derivs[3] is not None
+        if has_cubics or has_quartics:
+            freqs = np.abs(np.asarray(deriv_modes.freqs))
+            amu_conv = UnitsData.convert("AtomicMassUnits", "AtomicUnitOfMass")
+            k = len(freqs)
+            # overlap between the coordinates of the derivatives and the ones we want
+            overlap = cls._mode_jacobians(deriv_modes, masses)[1] @ mat
+
+        cubics = None
+        if has_cubics:
+            thirds = derivs[2]
+            if thirds.shape[0] != k:
+                raise ValueError("{}: cubic derivatives have {} modes but the derivative modes have {}".format(
+                    cls.__name__, thirds.shape[0], k
+                ))
+            thirds = thirds / np.sqrt(freqs * amu_conv)[:, np.newaxis, np.newaxis]
+            thirds = np.einsum('ij,iab,ak,bl->jkl', overlap, thirds, mat, mat)
+            inds = np.indices((m, m, m)).reshape((3, -1)).T
+            cubics = cls._unique_terms(inds, thirds.flatten(), tol)
+
+        quartics = None
+        if has_quartics:
+            # we only have d^4V/dQ_i^2 dQ_j dQ_k so the target coordinates need to be (signed) fchk modes
+            sel = np.argmax(np.abs(overlap), axis=0)
+            signs = overlap[sel, np.arange(m)]
+            expected = np.zeros_like(overlap)
+            expected[sel, np.arange(m)] = signs
+            if not (np.allclose(np.abs(signs), 1., atol=1e-4) and np.allclose(overlap, expected, atol=1e-4)):
+                raise ValueError(
+                    "{}: semi-diagonal quartic derivatives can only be expressed in (a subset of) the modes they came with".format(
+                        cls.__name__
+                    )
+                )
+            diag = derivs[3][sel, sel] / (freqs[sel] * amu_conv)[:, np.newaxis, np.newaxis]
+            fourths = np.einsum('iab,aj,bk->ijk', diag, mat, mat)
+            inds = np.indices((m, m, m)).reshape((3, -1)).T
+            quartics = cls._unique_terms(inds[:, (0, 0, 1, 2)], fourths.flatten(), tol)
+
+        return cls(center, ref, inv, grad, hess, cubic_terms=cubics, quartic_terms=quartics)
+
+    def evaluate_coordinates(self, q):
+        """
+        Evaluates the expansion at displacements already in the expansion coordinates
+
+        :param q: (n, m) displacements
+        :type q: np.ndarray
+        :return:
+        :rtype: np.ndarray
+        """
+        q = np.asarray(q)
+        vals = self.ref + q @ self.gradient + np.einsum('ni,ni->n', q @ self.hessian, q) / 2
+        for terms in (self.cubic_terms, self.quartic_terms):
+            if terms is not None:
+                inds, coeffs = terms
+                prods = q[:, inds[:, 0]]
+                for c in range(1, inds.shape[1]):
+                    prods = prods * q[:, inds[:, c]]
+                vals = vals + prods @ coeffs
+        return vals
+
+    def __call__(self, points, chunk_size=10000):
+        """
+        Evaluates the potential at a set of Cartesian points
+
+        :param points: (..., N, 3) or flattened (..., 3N) coordinates
+        :type points: np.ndarray
+        :param chunk_size: the number of points to evaluate at once
+        :type chunk_size: int
+        :return:
+        :rtype: np.ndarray
+        """
+        pts = np.asarray(points)
+        ncrd = len(self.center)
+        if pts.shape[-1] != ncrd:
+            pts = np.reshape(pts, pts.shape[:-2] + (ncrd,))
+        if pts.ndim == 1:
+            pts = pts[np.newaxis]
+        extra_shape = pts.shape[:-1]
+        pts = pts.reshape((-1, ncrd))
+
+        vals = np.empty(len(pts))
+        for s in range(0, len(pts), chunk_size):
+            q = (pts[s:s+chunk_size] - self.center[np.newaxis]) @ self.inverse.T
+            vals[s:s+chunk_size] = self.evaluate_coordinates(q)
+        return vals.reshape(extra_shape)
\ No newline at end of file
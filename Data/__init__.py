@@ -8,6 +8,8 @@ Not sure at this point, though.
 
 
 from .Surfaces import *
+from .Checkpoints import *
 
 __all__ = []
-__all__ += Surfaces.__all__
\ No newline at end of file
+__all__ += Surfaces.__all__
+__all__ += Checkpoints.__all__
\ No newline at end of file
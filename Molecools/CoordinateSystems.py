@@ -7,7 +7,7 @@ __all__ = [
     "MolecularCartesianCoordinateSystem"
 ]
 
-import numpy as np
+import threading, numpy as np
 import McUtils.Numputils as nput
 
 from McUtils.Coordinerds import (
@@ -15,7 +15,61 @@ from McUtils.Coordinerds import (
     ZMatrixCoordinates, CartesianCoordinates3D, CoordinateSet
 )
 
-class MolecularZMatrixCoordinateSystem(ZMatrixCoordinateSystem):
+_augmented_orderings = {}
+def _augmented_ordering(ordering):
+    """
+    Returns the Z-matrix ordering with the first three atoms referencing the three embedding dummy atoms,
+    along with the ordering for the coordinates with the dummy atoms prepended.
+    These only depend on the ordering so we build them once and reuse them on every conversion.
+
+    :param ordering:
+    :type ordering: Iterable[Iterable[int]]
+    :return:
+    :rtype: (np.ndarray, np.ndarray)
+    """
+    ordering = np.asarray(ordering, dtype=int)
+    key = (ordering.shape, ordering.tobytes())
+    if key not in _augmented_orderings:
+        fixed = np.array(ordering)
+        fixed[0, 1] = -3; fixed[0, 2] = -2; fixed[0, 3] = -1
+        fixed[1, 2] = -2; fixed[1, 3] = -1
+        fixed[2, 3] = -1
+        augmented = np.concatenate([[[0, -1, -1, -1], [1, 0, -1, -1], [2, 0, 1, -1]], fixed + 3])
+        fixed.flags.writeable = False
+        augmented.flags.writeable = False
+        _augmented_orderings[key] = (fixed, augmented)
+    return _augmented_orderings[key]
+
+class _MolecularEmbedding:
+    """
+    Holds the embedding (center of mass and inertial axes) used by the molecular coordinate systems.
+    The embedding is only computed the first time the converter options are asked for, so that creating
+    a molecule (or a view onto one) doesn't pay for an inertia tensor diagonalization it might never use.
+    """
+
+    @staticmethod
+    def _prep_options(molecule, converter_options, opts):
+        if converter_options is None:
+            converter_options = opts
+            opts = {}
+        if 'ordering' in converter_options:
+            converter_options['ordering'] = _augmented_ordering(converter_options['ordering'])[0]
+        converter_options['molecule'] = molecule
+        return converter_options, opts
+
+    @property
+    def converter_options(self):
+        opts = getattr(self, '_converter_options', None)
+        if opts is not None and 'origins' not in opts:
+            molecule = opts['molecule']
+            opts['origins'] = molecule.center_of_mass
+            opts['axes'] = molecule.inertial_axes[:2]
+        return opts
+    @converter_options.setter
+    def converter_options(self, opts):
+        self._converter_options = opts
+
+class MolecularZMatrixCoordinateSystem(_MolecularEmbedding, ZMatrixCoordinateSystem):
     """
     Mirrors the standard ZMatrix coordinate system in _almost_ all regards, but forces an embedding
     """
@@ -33,20 +87,7 @@ class MolecularZMatrixCoordinateSystem(ZMatrixCoordinateSystem):
         # from .Molecule import Molecule
         # molecule = molecule #type: Molecule
 
-        com = molecule.center_of_mass
-        axes = molecule.inertial_axes
-        if converter_options is None:
-            converter_options = opts
-            opts = {}
-        if 'ordering' in converter_options:
-            ordering = np.array(converter_options['ordering'], dtype=int)
-            ordering[0, 1] = -3; ordering[0, 2] = -2; ordering[0, 3] = -1
-            ordering[1, 2] = -2; ordering[1, 3] = -1
-            ordering[2, 3] = -1
-            converter_options['ordering'] = ordering
-        converter_options['origins'] = com
-        converter_options['axes'] = axes[:2]
-        converter_options['molecule'] = molecule
+        converter_options, opts = self._prep_options(molecule, converter_options, opts)
         nats = len(molecule.atoms)
         super().__init__(converter_options=converter_options, dimension=(nats, 3), coordinate_shape=(nats, 3), opts=opts)
     @property
@@ -56,7 +97,7 @@ class MolecularZMatrixCoordinateSystem(ZMatrixCoordinateSystem):
     def axes(self):
         return self.converter_options['axes']
 
-class MolecularCartesianCoordinateSystem(CartesianCoordinateSystem):
+class MolecularCartesianCoordinateSystem(_MolecularEmbedding, CartesianCoordinateSystem):
     """
     Mirrors the standard Cartesian coordinate system in _almost_ all regards, but forces an embedding
     """
@@ -72,22 +113,7 @@ class MolecularCartesianCoordinateSystem(CartesianCoordinateSystem):
         :type opts:
         """
 
-        from .Molecule import Molecule
-        molecule = molecule #type: Molecule
-        com = molecule.center_of_mass
-        axes = molecule.inertial_axes
-        if converter_options is None:
-            converter_options = opts
-            opts = {}
-        if 'ordering' in converter_options:
-            ordering = np.array(converter_options['ordering'], dtype=int)
-            ordering[0, 1] = -3; ordering[0, 2] = -2; ordering[0, 3] = -1
-            ordering[1, 2] = -2; ordering[1, 3] = -1
-            ordering[2, 3] = -1
-            converter_options['ordering'] = ordering
-        converter_options['origins'] = com
-        converter_options['axes'] = axes[:2]
-        converter_options['molecule'] = molecule
+        converter_options, opts = self._prep_options(molecule, converter_options, opts)
         nats = len(molecule.atoms)
         super().__init__(converter_options=converter_options, dimension=(nats, 3), opts=opts)
 
@@ -96,10 +122,71 @@ class MolecularCartesianToMatrixConverter(CoordinateSystemConverter):
     ...
     """
     types = (MolecularCartesianCoordinateSystem, MolecularZMatrixCoordinateSystem)
+    fast_options = {'use_rad'} # the options the vectorized path knows how to handle
+    _buffers = threading.local()
+    def _augmented_buffer(self, n_sys, n_atoms):
+        # holds the dummy atoms + real atoms, reused across calls with the same shape
+        # (everything we need from it is copied out before `convert_fast` returns)
+        # and kept per thread so that walker chunks can be converted concurrently
+        shape = (n_sys, n_atoms + 3, 3)
+        buf = getattr(self._buffers, 'buffer', None)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape)
+            self._buffers.buffer = buf
+        return buf
+
+    def convert_fast(self, coords, origins, axes, ordering, out=None, use_rad=True):
+        """
+        Converts many sets of Cartesian coordinates to embedded Z-matrix coordinates in a single vectorized pass,
+        writing the dummy atoms and coordinates into a reused buffer instead of concatenating them
+
+        :param coords: (n, N, 3) Cartesian coordinates
+        :type coords: np.ndarray
+        :param origins: the embedding origin(s)
+        :type origins: np.ndarray
+        :param axes: the embedding axes
+        :type axes: np.ndarray
+        :param ordering: the Z-matrix ordering
+        :type ordering: np.ndarray
+        :param out: an (n, N, 3) array to write the Z-matrix coordinates into
+        :type out: np.ndarray | None
+        :param use_rad: whether to return angles in radians
+        :type use_rad: bool
+        :return:
+        :rtype: np.ndarray
+        """
+        n_sys = coords.shape[0]
+        n_atoms = coords.shape[1]
+        fixed, augmented = _augmented_ordering(ordering)
+        rows = augmented[3:]
+
+        buf = self._augmented_buffer(n_sys, n_atoms)
+        origins = np.reshape(origins, (-1, 1, 3))
+        buf[:, :1] = origins
+        buf[:, 1:3] = origins + np.reshape(axes, (-1, 2, 3))
+        buf[:, 3:] = coords
+
+        if out is None:
+            out = np.empty((n_sys, len(rows), 3))
+        a = buf[:, rows[:, 0]]
+        b = buf[:, rows[:, 1]]
+        c = buf[:, rows[:, 2]]
+        d = buf[:, rows[:, 3]]
+        out[..., 0] = nput.vec_norms(a - b)
+        out[..., 1] = nput.vec_angles(a - b, c - b)[0]
+        out[..., 2] = nput.pts_dihedrals(a, b, c, d)
+        if not use_rad:
+            out[..., 1:] = np.rad2deg(out[..., 1:])
+        return out
+
     def convert(self, coords, molecule=None, origins=None, axes=None, ordering=None, **kwargs):
         """
         Converts from Cartesian to ZMatrix coords, preserving the embedding
         """
+        if ordering is not None and set(kwargs) <= self.fast_options:
+            zmcs, opts = self.convert_many(coords[np.newaxis], molecule=molecule, origins=origins, axes=axes, ordering=ordering, **kwargs)
+            return zmcs[0], opts
+
         n_coords = len(coords)
         n_atoms = len(molecule.atoms)
 
@@ -109,14 +196,7 @@ class MolecularCartesianToMatrixConverter(CoordinateSystemConverter):
             origins = origins[np.newaxis]
         coords = np.concatenate([origins, origins+axes, coords], axis=0)
         if ordering is not None:
-            ordering = np.array(ordering, dtype=int)
-            ordering[0, 1] = -3; ordering[0, 2] = -2; ordering[0, 3] = -1
-            ordering[1, 2] = -2; ordering[1, 3] = -1
-            ordering[2, 3] = -1
-            ordering = ordering + 3
-            ordering = np.concatenate([ [[0, -1, -1, -1], [1, 0, -1, -1], [2, 0, 1, -1]], ordering])
-
-            # raise Exception(ordering)
+            ordering = np.array(_augmented_ordering(ordering)[1])
 
         res = CoordinateSet(coords, CartesianCoordinates3D).convert(ZMatrixCoordinates,
                                                                     ordering=ordering,
@@ -137,11 +217,17 @@ class MolecularCartesianToMatrixConverter(CoordinateSystemConverter):
             derivs = opts['derivs'][3:][:, :, 2:]
             opts['derivs'] = derivs
         return zmcs, opts
-    def convert_many(self, coords, molecule=None, origins=None, axes=None, ordering=None, **kwargs):
+    def convert_many(self, coords, molecule=None, origins=None, axes=None, ordering=None, out=None, **kwargs):
         """
-        Converts from Cartesian to ZMatrix coords, preserving the embedding
+        Converts from Cartesian to ZMatrix coords, preserving the embedding.
+        When no derivatives are requested this goes through `convert_fast`, optionally writing into `out`.
         """
 
+        if ordering is not None and set(kwargs) <= self.fast_options:
+            zmcs = self.convert_fast(np.asarray(coords), origins, axes, ordering, out=out, **kwargs)
+            opts = dict(kwargs, ordering=_augmented_ordering(ordering)[0], origins=origins, axes=axes)
+            return zmcs, opts
+
         n_sys = coords.shape[0]
         n_coords = coords.shape[1]
         n_atoms = len(molecule.atoms)
@@ -153,12 +239,7 @@ class MolecularCartesianToMatrixConverter(CoordinateSystemConverter):
             axes = np.broadcast_to(axes[np.newaxis], (n_sys, 2, 3))
         coords = np.concatenate([origins, origins+axes, coords], axis=1)
         if ordering is not None:
-            ordering = np.array(ordering, dtype=int)
-            ordering[0, 1] = -3; ordering[0, 2] = -2; ordering[0, 3] = -1
-            ordering[1, 2] = -2; ordering[1, 3] = -1
-            ordering[2, 3] = -1
-            ordering = ordering + 3
-            ordering = np.concatenate([ [[0, -1, -1, -1], [1, 0, -1, -1], [2, 0, 1, -1]], ordering])
+            ordering = np.array(_augmented_ordering(ordering)[1])
 
         res = CoordinateSet(coords, CartesianCoordinates3D).convert(ZMatrixCoordinates,
                                                                     ordering=ordering,
@@ -236,9 +317,7 @@ class MolecularZMatrixToCartesianConverter(CoordinateSystemConverter):
 
         coords = np.concatenate([extra_coords, coords], axis=-2)
         if ordering is not None:
-            ordering = np.array(ordering, dtype=int)
-            ordering = ordering + 3
-            ordering = np.concatenate([ [[0, -1, -1, -1], [1, 0, -1, -1], [2, 0, 1, -1]], ordering])
+            ordering = np.array(_augmented_ordering(ordering)[1])
         # raise Exception([ordering, coords])
         res = CoordinateSet(coords, ZMatrixCoordinates).convert(CartesianCoordinates3D,
                                                                         ordering=ordering,
@@ -0,0 +1,261 @@
+"""
+Provides a generator of finite-difference displacement grids along normal modes (or internal coordinates)
+for building force fields from electronic structure data, along with the assembler that turns the
+energies or gradients computed at those points back into potential derivatives
+"""
+
+import math, numpy as np, itertools as ip
+from McUtils.Coordinerds import CoordinateSet
+
+__all__ = [
+    "FiniteDifferenceDisplacements"
+]
+
+class FiniteDifferenceDisplacements:
+    """
+    Enumerates the 1D, 2D, and 3D displacement stencils needed to get derivatives of the potential
+    up to `order` by finite differences.
+    Points are generated lazily and only ever once: a point is owned by the set of modes it is displaced along,
+    so the grids for pairs and triples of modes reuse the points from the 1D and 2D grids.
+    """
+
+    def __init__(self,
+                 molecule,
+                 basis=None,
+                 step_size=.01,
+                 order=4,
+                 data="energies",
+                 coupling=None,
+                 internal=None
+                 ):
+        """
+        :param molecule: the reference molecule
+        :type molecule: Molecule
+        :param basis: the displacement coordinates, either normal modes or a (3N, m) matrix of displacement vectors (defaults to the normal modes of `molecule`)
+        :type basis: MolecularNormalModes | np.ndarray | None
+        :param step_size: the finite difference step along each coordinate
+        :type step_size: float
+        :param order: the highest order of potential derivative we want
+        :type order: int
+        :param data: whether the electronic structure data will be `'energies'` or `'gradients'`
+        :type data: str
+        :param coupling: the most coordinates displaced at once (defaults to what `order` needs)
+        :type coupling: int | None
+        :param internal: whether the displacement vectors are in the molecule's internal coordinates (defaults to what `basis` says)
+        :type internal: bool | None
+        """
+
+        if data not in ("energies", "gradients"):
+            raise ValueError("{}: data must be 'energies' or 'gradients', not '{}'".format(type(self).__name__, data))
+        self.molecule = molecule
+        if basis is None:
+            basis = molecule.normal_modes.basis
+        if internal is None:
+            internal = getattr(basis, 'in_internals', False)
+        if hasattr(basis, 'matrix'):
+            matrix = np.asarray(basis.matrix)
+            inverse = None if basis.inverse is None else np.asarray(basis.inverse)
+        else:
+            matrix = np.asarray(basis)
+            inverse = None
+        if inverse is None:
+            inverse = np.linalg.pinv(matrix)
+        if internal and data == "gradients":
+            raise ValueError("{}: gradients can only be assembled for Cartesian displacements".format(type(self).__name__))
+        self.matrix = matrix
+        self.inverse = inverse
+        self.internal = internal
+        self.step_size = step_size
+        self.order = order
+        self.data = data
+
+        # gradients already carry one derivative so we need one less by finite differences
+        self._fd_order = order - (1 if data == "gradients" else 0)
+        if coupling is None:
+            coupling = min(self._fd_order, 2 if data == "gradients" else 3)
+        self.coupling = coupling
+        self._index = None
+
+    @property
+    def num_coordinates(self):
+        return self.matrix.shape[1]
+
+    def stencil_width(self, dim):
+        """
+        The number of steps in each direction used for grids displaced along `dim` coordinates at once.
+        Each coordinate of a `dim`-dimensional grid needs at most `fd_order - dim + 1` derivatives.
+
+        :param dim:
+        :type dim: int
+        :return:
+        :rtype: int
+        """
+        return max(1, int(np.ceil((self._fd_order - dim + 1) / 2)))
+
+    def keys(self):
+        """
+        Lazily enumerates the displacements as tuples of (coordinate, number of steps) pairs,
+        starting with the reference geometry `()`
+
+        :return:
+        :rtype: Iterator[tuple]
+        """
+        yield ()
+        for dim in range(1, self.coupling + 1):
+            p = self.stencil_width(dim)
+            steps = [s for s in range(-p, p + 1) if s != 0]
+            for coords in ip.combinations(range(self.num_coordinates), dim):
+                for offsets in ip.product(steps, repeat=dim):
+                    yield tuple(zip(coords, offsets))
+
+    def __len__(self):
+        m = self.num_coordinates
+        return 1 + sum(
+            math.comb(m, d) * (2 * self.stencil_width(d)) ** d
+            for d in range(1, self.coupling + 1)
+        )
+
+    def _displacement_matrix(self, keys):
+        disps = np.zeros((len(keys), self.num_coordinates))
+        for i, k in enumerate(keys):
+            for c, s in k:
+                disps[i, c] = s
+        return self.step_size * disps
+
+    def geometries(self, keys):
+        """
+        Returns the Cartesian geometries for a set of displacements
+
+        :param keys:
+        :type keys: Iterable[tuple]
+        :return: (n, N, 3) Cartesian coordinates
+        :rtype: np.ndarray
+        """
+        keys = list(keys)
+        disps = self._displacement_matrix(keys) @ self.matrix.T
+        if self.internal:
+            ref = self.molecule.internal_coordinates
+            ints = np.asarray(ref).flatten()[np.newaxis] + disps
+            crds = CoordinateSet(ints.reshape((len(keys),) + ref.shape[-2:]), ref.system)
+            return np.asarray(crds.convert(self.molecule.coords.system))
+        else:
+            ref = np.asarray(self.molecule.coords)
+            return (ref.flatten()[np.newaxis] + disps).reshape((len(keys),) + ref.shape)
+
+    def batches(self, batch_size=1000):
+        """
+        Lazily yields the displaced Cartesian geometries in batches.
+        Results need to be handed back to `assemble` in the same order.
+
+        :param batch_size:
+        :type batch_size: int
+        :return:
+        :rtype: Iterator[np.ndarray]
+        """
+        keys = self.keys()
+        while True:
+            batch = list(ip.islice(keys, batch_size))
+            if len(batch) == 0:
+                break
+            yield self.geometries(batch)
+    def __iter__(self):
+        return self.batches()
+
+    @staticmethod
+    def _weights(order, width):
+        # solves for the central difference weights on -width...width
+        offsets = np.arange(-width, width + 1)
+        npts = len(offsets)
+        vander = offsets[np.newaxis, :] ** np.arange(npts)[:, np.newaxis]
+        rhs = np.zeros(npts)
+        rhs[order] = math.factorial(order)
+        return np.linalg.solve(vander, rhs)
+
+    def _fd_derivative(self, values, counts):
+        """
+        Applies the product finite difference stencil for the derivative with `counts[c]` derivatives along each coordinate `c`
+        """
+        coords = sorted(counts)
+        p = self.stencil_width(len(coords))
+        weights = [self._weights(counts[c], p) for c in coords]
+        total = np.zeros(values.shape[1:])
+        for offsets in ip.product(range(-p, p + 1), repeat=len(coords)):
+            w = np.prod([wts[s + p] for wts, s in zip(weights, offsets)])
+            if w != 0:
+                key = tuple((c, s) for c, s in zip(coords, offsets) if s != 0)
+                total = total + w * values[self._index[key]]
+        return total / self.step_size ** sum(counts.values())
+
+    def mode_derivatives(self, values):
+        """
+        Turns the energies or gradients at every point into derivatives of the potential
+        with respect to the displacement coordinates. Derivatives that would need more than `coupling`
+        coordinates displaced at once are left as zero.
+
+        :param values: (n,) energies or (n, 3N) Cartesian gradients, in the order the geometries were generated
+        :type values: np.ndarray
+        :return: the derivative tensors for orders 1 through `order`
+        :rtype: list[np.ndarray]
+        """
+        values = np.asarray(values)
+        if len(values) != len(self):
+            raise ValueError("{}: got {} values for {} displacements".format(type(self).__name__, len(values), len(self)))
+        m = self.num_coordinates
+        if self._index is None:
+            self._index = {k: i for i, k in enumerate(self.keys())}
+        if self.data == "gradients":
+            # chain rule: dV/dQ_j = sum_x dV/dx dx/dQ_j
+            values = values.reshape((len(values), -1)) @ self.matrix
+            base = 1
+        else:
+            base = 0
+
+        derivs = []
+        for rank in range(1, self.order + 1):
+            tensor = np.zeros((m,) * rank)
+            counts_filled = np.zeros((m,) * rank, dtype=int)
+            for idx in ip.combinations_with_replacement(range(m), rank - base):
+                counts = {}
+                for c in idx:
+                    counts[c] = counts.get(c, 0) + 1
+                if len(counts) > self.coupling:
+                    continue
+                if len(counts) == 0:
+                    val = values[0]
+                else:
+                    val = self._fd_derivative(values, counts)
+                if base == 1:
+                    # the same element can come from differentiating different gradient components
+                    # so we average all of the estimates we get
+                    for j in range(m):
+                        for perm in set(ip.permutations(idx + (j,))):
+                            tensor[perm] += val[j]
+                            counts_filled[perm] += 1
+                else:
+                    for perm in set(ip.permutations(idx)):
+                        tensor[perm] = val
+                        counts_filled[perm] = 1
+            derivs.append(tensor / np.maximum(counts_filled, 1))
+        return derivs
+
+    def assemble(self, values):
+        """
+        Assembles the potential derivatives in the layout `PotentialTerms` takes,
+        i.e. the Cartesian gradient and force constants followed by the cubic and quartic derivatives
+        with the leading axes in the displacement coordinates and the trailing two in Cartesians
+
+        :param values: (n,) energies or (n, 3N) Cartesian gradients, in the order the geometries were generated
+        :type values: np.ndarray
+        :return:
+        :rtype: tuple[np.ndarray]
+        """
+        derivs = self.mode_derivatives(values)
+        inv = self.inverse
+        cart = [inv.T @ derivs[0]]
+        if len(derivs) > 1:
+            cart.append(inv.T @ derivs[1] @ inv)
+        if len(derivs) > 2:
+            cart.append(np.einsum('kij,ia,jb->kab', derivs[2], inv, inv))
+        if len(derivs) > 3:
+            cart.append(np.einsum('klij,ia,jb->klab', derivs[3], inv, inv))
+        return tuple(cart)
@@ -0,0 +1,170 @@
+"""
+Provides a walker-ensemble layer for DMC-style workloads, where the same set of properties
+is needed for huge numbers of configurations of a single molecule every step
+"""
+
+import numpy as np
+from .Properties import MolecularProperties
+from .CoordinateSystems import MolecularCartesianToMatrixConverter
+
+__all__ = [
+    "WalkerEnsemble"
+]
+
+class WalkerEnsemble:
+    """
+    Evaluates molecular properties over an (n_walkers, n_atoms, 3) array of configurations.
+    The walker axis is split into chunks and every requested property is computed for a chunk before moving
+    on to the next one, so intermediates (like the centers of mass) are shared between properties
+    and memory use is bounded by the chunk size. Chunks can be farmed out to a thread pool.
+
+    A property is implemented as a method called `kernel_<prop name>` that takes a chunk of coordinates, the shared
+    per-chunk cache, and any options, and returns an array with one entry per walker.
+    """
+
+    def __init__(self, coords, masses, chunk_size=10000, num_workers=None):
+        """
+        :param coords: (n_walkers, n_atoms, 3) walker coordinates
+        :type coords: np.ndarray
+        :param masses: the atomic masses
+        :type masses: np.ndarray
+        :param chunk_size: the number of walkers handled at once
+        :type chunk_size: int
+        :param num_workers: the number of threads to split the walker axis over
+        :type num_workers: int | None
+        """
+        coords = np.asarray(coords)
+        if coords.ndim == 2:
+            coords = coords[np.newaxis]
+        self.coords = coords
+        self.masses = np.asarray(masses)
+        self.weights = self.masses / np.sum(self.masses)
+        self.chunk_size = chunk_size
+        self.num_workers = num_workers
+
+    @classmethod
+    def from_molecule(cls, mol, coords=None, **opts):
+        """
+        :param mol: the molecule the walkers are configurations of
+        :type mol: Molecule
+        :param coords: the walker coordinates (defaults to the configurations of `mol`)
+        :type coords: np.ndarray | None
+        :param opts:
+        :type opts:
+        :return:
+        :rtype: WalkerEnsemble
+        """
+        if coords is None:
+            coords = mol.coords
+        return cls(coords, mol.masses, **opts)
+
+    def __len__(self):
+        return len(self.coords)
+
+    def _evaluate(self, props, coords, opts):
+        cache = {}
+        return {p: np.asarray(getattr(self, 'kernel_' + p)(coords, cache, **opts)) for p in props}
+
+    def compute(self, *props, **opts):
+        """
+        Computes a set of properties for every walker in a single pass over the ensemble
+
+        :param props: the names of the properties to compute
+        :type props: str
+        :param opts: options for the property kernels (e.g. `reference`, `ordering`, `dipole_function`)
+        :type opts:
+        :return: the properties, each with one entry per walker
+        :rtype: dict
+        """
+        for p in props:
+            if not hasattr(self, 'kernel_' + p):
+                raise ValueError("{}: property '{}' unknown".format(type(self).__name__, p))
+        n = len(self)
+        bounds = [(s, min(s + self.chunk_size, n)) for s in range(0, n, self.chunk_size)]
+
+        # the first chunk tells us the output shapes so that everything else can be written in place
+        s, e = bounds[0]
+        first = self._evaluate(props, self.coords[s:e], opts)
+        results = {k: np.empty((n,) + v.shape[1:], dtype=v.dtype) for k, v in first.items()}
+        for k, v in first.items():
+            results[k][s:e] = v
+
+        def run(bound):
+            s, e = bound
+            for k, v in self._evaluate(props, self.coords[s:e], opts).items():
+                results[k][s:e] = v
+
+        if self.num_workers is not None and self.num_workers > 1 and len(bounds) > 2:
+            # the kernels are numpy calls that release the GIL, so threads give us real parallelism
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+                list(executor.map(run, bounds[1:]))
+        else:
+            for b in bounds[1:]:
+                run(b)
+
+        return results
+
+    def kernel_center_of_mass(self, coords, cache, **opts):
+        if 'center_of_mass' not in cache:
+            cache['center_of_mass'] = np.tensordot(coords, self.weights, axes=[1, 0])
+        return cache['center_of_mass']
+    def center_of_mass(self):
+        """
+        :return: (n_walkers, 3) centers of mass
+        :rtype: np.ndarray
+        """
+        return self.compute('center_of_mass')['center_of_mass']
+
+    def kernel_inertia_tensors(self, coords, cache, **opts):
+        com = self.kernel_center_of_mass(coords, cache)
+        return MolecularProperties.get_prop_inertia_tensors(coords - com[:, np.newaxis, :], self.masses)
+    def inertia_tensors(self):
+        """
+        :return: (n_walkers, 3, 3) inertia tensors about the centers of mass
+        :rtype: np.ndarray
+        """
+        return self.compute('inertia_tensors')['inertia_tensors']
+
+    def kernel_eckart_rotations(self, coords, cache, reference=None, **opts):
+        if reference is None:
+            raise ValueError("{}: Eckart rotations need a `reference` geometry".format(type(self).__name__))
+        return MolecularProperties.get_prop_eckart_rotations(self.masses, np.asarray(reference), coords)[0]
+    def eckart_rotations(self, reference):
+        """
+        :param reference: the (n_atoms, 3) reference geometry
+        :type reference: np.ndarray
+        :return: (n_walkers, 3, 3) rotations onto the reference
+        :rtype: np.ndarray
+        """
+        return self.compute('eckart_rotations', reference=reference)['eckart_rotations']
+
+    def kernel_internal_coordinates(self, coords, cache, ordering=None, **opts):
+        if ordering is None:
+            raise ValueError("{}: internal coordinates need a Z-matrix `ordering`".format(type(self).__name__))
+        # we embed the same way MolecularCartesianCoordinateSystem does for a single configuration
+        if 'principal_inertia' not in cache:
+            cache['principal_inertia'] = MolecularProperties.get_prop_principal_inertia(coords, self.masses)
+        _, axes, com = cache['principal_inertia']
+        return MolecularCartesianToMatrixConverter.convert_fast(coords, com, axes[:, :2], ordering)
+    def internal_coordinates(self, ordering):
+        """
+        :param ordering: the Z-matrix ordering
+        :type ordering: Iterable[Iterable[int]]
+        :return: (n_walkers, n_atoms, 3) embedded Z-matrix coordinates
+        :rtype: np.ndarray
+        """
+        return self.compute('internal_coordinates', ordering=ordering)['internal_coordinates']
+
+    def kernel_dipoles(self, coords, cache, dipole_function=None, **opts):
+        if dipole_function is None:
+            raise ValueError("{}: dipoles need a `dipole_function`".format(type(self).__name__))
+        return dipole_function(coords)
+    def dipoles(self, dipole_function):
+        """
+        :param dipole_function: a function (e.g. a `DipoleSurface`) that takes a chunk of walker coordinates
+        :type dipole_function: function
+        :return: (n_walkers, 3) dipoles
+        :rtype: np.ndarray
+        """
+        return self.compute('dipoles', dipole_function=dipole_function)['dipoles']
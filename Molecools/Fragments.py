@@ -0,0 +1,184 @@
+"""
+Provides an incremental fragment tracker for following how a cluster breaks apart (or comes together)
+over long trajectories, where the bonding pattern changes rarely between frames
+"""
+
+import numpy as np, scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+__all__ = [
+    "FragmentTracker"
+]
+
+class FragmentTracker:
+    """
+    Tracks the connected fragments of a molecule frame by frame.
+    Only pairs of atoms in a Verlet-style neighbor list (pairs within the largest bond cutoff plus a `skin`) are checked,
+    and that list is only rebuilt once some atom has moved more than half the skin since it was built.
+    The adjacency matrix is kept between frames and only the bonds whose distance crossed the cutoff get touched,
+    and the connected components are only recomputed when one of those changes actually happened.
+    """
+
+    def __init__(self, elements, tol=1.05, skin=.5):
+        """
+        :param elements: the element symbols for the atoms
+        :type elements: Iterable[str]
+        :param tol: the tolerance relative to the single-bond length used to decide if two atoms are bonded
+        :type tol: float
+        :param skin: the extra distance past the largest bond cutoff that goes into the neighbor list
+        :type skin: float
+        """
+        from .Properties import MolecularProperties
+
+        elements = np.asarray(elements)
+        uniq, el_inds = np.unique(elements, return_inverse=True)
+        self.num_atoms = len(elements)
+        self.cutoffs = tol * MolecularProperties.get_prop_bond_cutoff_table(uniq)[0][np.ix_(el_inds, el_inds)]
+        finite = np.isfinite(self.cutoffs)
+        self.max_cutoff = np.max(self.cutoffs[finite]) if finite.any() else 0.
+        self.skin = skin
+
+        self._ref_coords = None
+        self._pairs = np.zeros((0, 2), dtype=int)
+        self._pair_cutoffs = np.zeros((0,))
+        self._bonded = np.zeros((0,), dtype=bool)
+        self._adj = sp.lil_matrix((self.num_atoms, self.num_atoms), dtype=bool)
+        self._labels = None
+        self._fragments = None
+        self.changed = False
+
+    @classmethod
+    def from_molecule(cls, mol, **opts):
+        """
+        :param mol:
+        :type mol: Molecule
+        :param opts:
+        :type opts:
+        :return:
+        :rtype: FragmentTracker
+        """
+        return cls(mol.atom_table.element_symbols, **opts)
+
+    @staticmethod
+    def split_labels(labels, num_groups=None):
+        """
+        Turns connected-component labels into one index array per component
+
+        :param labels:
+        :type labels: np.ndarray
+        :param num_groups:
+        :type num_groups: int | None
+        :return:
+        :rtype: list[np.ndarray]
+        """
+        labels = np.asarray(labels)
+        if num_groups is None:
+            num_groups = np.max(labels) + 1 if len(labels) > 0 else 0
+        order = np.argsort(labels, kind='stable')
+        splits = np.searchsorted(labels[order], np.arange(1, num_groups))
+        return np.split(order, splits)
+
+    def _set_bonds(self, pairs, value):
+        if len(pairs) > 0:
+            self._adj[pairs[:, 0], pairs[:, 1]] = value
+            self._adj[pairs[:, 1], pairs[:, 0]] = value
+            self.changed = True
+
+    def _rebuild_neighbors(self, coords):
+        from scipy.spatial import cKDTree
+
+        pairs = cKDTree(coords).query_pairs(self.max_cutoff + self.skin, output_type='ndarray')
+        if len(pairs) == 0:
+            pairs = np.zeros((0, 2), dtype=int)
+        pair_cutoffs = self.cutoffs[pairs[:, 0], pairs[:, 1]]
+        keep = np.isfinite(pair_cutoffs)
+        pairs = pairs[keep]
+        pair_cutoffs = pair_cutoffs[keep]
+
+        # anything bonded that fell out of the list is now farther apart than any cutoff
+        old_bonds = self._pairs[self._bonded]
+        old_keys = old_bonds[:, 0] * self.num_atoms + old_bonds[:, 1]
+        new_keys = pairs[:, 0] * self.num_atoms + pairs[:, 1]
+        in_list = np.isin(old_keys, new_keys)
+        self._set_bonds(old_bonds[np.logical_not(in_list)], False)
+
+        self._pairs = pairs
+        self._pair_cutoffs = pair_cutoffs
+        self._bonded = np.isin(new_keys, old_keys[in_list])
+        self._ref_coords = coords.copy()
+
+    def update(self, coords):
+        """
+        Moves the tracker on to a new frame
+
+        :param coords: (n_atoms, 3) coordinates for the frame
+        :type coords: np.ndarray
+        :return: the index arrays for the fragments in the frame
+        :rtype: list[np.ndarray]
+        """
+        coords = np.asarray(coords)
+        self.changed = False
+        if (
+                self._ref_coords is None
+                or np.max(np.linalg.norm(coords - self._ref_coords, axis=1)) > self.skin / 2
+        ):
+            self._rebuild_neighbors(coords)
+
+        i, j = self._pairs[:, 0], self._pairs[:, 1]
+        bonded = np.linalg.norm(coords[i] - coords[j], axis=1) < self._pair_cutoffs
+        flipped = bonded != self._bonded
+        if flipped.any():
+            self._set_bonds(self._pairs[flipped & bonded], True)
+            self._set_bonds(self._pairs[flipped & np.logical_not(bonded)], False)
+            self._bonded = bonded
+
+        if self.changed or self._fragments is None:
+            adj = self._adj.tocsr()
+            adj.eliminate_zeros()
+            ngroups, self._labels = connected_components(adj, directed=False)
+            self._fragments = self.split_labels(self._labels, ngroups)
+            self.changed = True
+        return self._fragments
+
+    @property
+    def labels(self):
+        """
+        The fragment each atom belongs to in the current frame
+
+        :return:
+        :rtype: np.ndarray
+        """
+        return self._labels
+
+    @property
+    def fragments(self):
+        """
+        The index arrays for the fragments in the current frame
+
+        :return:
+        :rtype: list[np.ndarray]
+        """
+        return self._fragments
+
+    @property
+    def bonds(self):
+        """
+        The (atom, atom) pairs bonded in the current frame
+
+        :return:
+        :rtype: np.ndarray
+        """
+        return self._pairs[self._bonded]
+
+    def track(self, coords):
+        """
+        Lazily runs the tracker over a set of frames.
+        The same list is handed back for consecutive frames with the same fragments.
+
+        :param coords: (n_frames, n_atoms, 3) coordinates
+        :type coords: Iterable[np.ndarray]
+        :return:
+        :rtype: Iterator[list[np.ndarray]]
+        """
+        for c in coords:
+            yield self.update(c)
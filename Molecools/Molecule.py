@@ -11,9 +11,117 @@ from .CoordinateSystems import MolecularCartesianCoordinateSystem, MolecularZMat
 
 __all__ = [
     "Molecule",
+    "AtomTable",
     "MolecoolException"
 ]
 
+class AtomTable:
+    """
+    An array-backed view of a set of `AtomData` records so that hot loops
+    can pull masses, atomic numbers, etc. without doing any dict lookups.
+    Derived vectors (like the triple-mass vector) are cached on the table, so a new
+    table gets built whenever the masses change.
+    """
+
+    def __init__(self, records, masses=None):
+        """
+        :param records: the `AtomData` records for the atoms
+        :type records: Iterable[AtomData]
+        :param masses: masses to use in place of the ones in the records (e.g. for isotopic substitution)
+        :type masses: Iterable[float] | None
+        """
+        self.records = tuple(records)
+        self.symbols = tuple(a["Symbol"] for a in self.records)
+        self.element_symbols = tuple(a["ElementSymbol"] for a in self.records)
+        self.atomic_numbers = self._freeze(np.array([a["Number"] for a in self.records], dtype=int))
+        record_masses = np.array([a["Mass"] for a in self.records], dtype=float)
+        if masses is None:
+            masses = record_masses
+        masses = np.array(masses, dtype=float)
+        if masses.shape != (len(self.records),):
+            raise ValueError("{}: got {} masses for {} atoms".format(type(self).__name__, masses.shape, len(self.records)))
+        self.masses = self._freeze(masses)
+        # mass numbers come from the atom data, since a standard atomic weight can round to the wrong isotope,
+        # but masses set explicitly are nuclide masses, which lie within half a unit of their mass numbers
+        record_isotopes = np.array([a["MassNumber"] for a in self.records], dtype=int)
+        self.isotopes = self._freeze(
+            np.where(np.isclose(masses, record_masses), record_isotopes, np.round(masses).astype(int))
+        )
+        self.radii = self._freeze(np.array([a["IconRadius"] for a in self.records], dtype=float))
+        self._derived = {}
+
+    @staticmethod
+    def _freeze(arr):
+        # the arrays are shared by every caller, so we make sure nobody modifies them in place
+        arr.flags.writeable = False
+        return arr
+
+    def cached(self, key, builder):
+        """
+        Returns the derived value `key`, calling `builder(self)` to build it the first time
+
+        :param key:
+        :type key: str
+        :param builder:
+        :type builder: function
+        :return:
+        :rtype:
+        """
+        if key not in self._derived:
+            val = builder(self)
+            if isinstance(val, np.ndarray):
+                val = self._freeze(val)
+            self._derived[key] = val
+        return self._derived[key]
+
+    @property
+    def triple_masses(self):
+        """
+        The masses repeated for each Cartesian coordinate, i.e. (m1, m1, m1, m2, ...)
+
+        :return:
+        :rtype: np.ndarray
+        """
+        return self.cached('triple_masses', lambda t: np.repeat(t.masses, 3))
+    @property
+    def total_mass(self):
+        return self.cached('total_mass', lambda t: np.sum(t.masses))
+    @property
+    def mass_weights(self):
+        """
+        The masses normalized by the total mass, as used for centers of mass
+
+        :return:
+        :rtype: np.ndarray
+        """
+        return self.cached('mass_weights', lambda t: t.masses / t.total_mass)
+
+    def with_masses(self, masses):
+        """
+        Returns a new table with the same atoms but different masses
+
+        :param masses:
+        :type masses: Iterable[float]
+        :return:
+        :rtype: AtomTable
+        """
+        return type(self)(self.records, masses=masses)
+
+    def take(self, indices):
+        """
+        Returns a table for a subset of the atoms, keeping their current masses
+
+        :param indices:
+        :type indices: Iterable[int]
+        :return:
+        :rtype: AtomTable
+        """
+        indices = np.asarray(indices, dtype=int)
+        return type(self)([self.records[i] for i in indices], masses=self.masses[indices])
+
+    def __len__(self):
+        return len(self.records)
+
 class Molecule:
     """
     General purpose 'Molecule' class where the 'Molecule' need not be a molecule at all
@@ -64,6 +172,8 @@ class Molecule:
         """
         # convert "atoms" into list of atom data
         self._ats = [AtomData[atom] if isinstance(atom, (int, np.integer, str)) else atom for atom in atoms]
+        self._atom_table = None
+        self._cache = {} # coordinate-dependent values, cleared whenever the coordinates change
 
         coords = CoordinateSet(coords, CartesianCoordinates3D)
 
@@ -121,11 +231,34 @@ class Molecule:
     def num_atoms(self):
         return len(self._ats)
     @property
+    def atom_table(self):
+        """
+        :return: array-backed atom data (atomic numbers, masses, isotopes, radii)
+        :rtype: AtomTable
+        """
+        if self._atom_table is None:
+            self._atom_table = AtomTable(self._ats)
+        return self._atom_table
+    @property
     def atoms(self):
-        return tuple(a["Symbol"] for a in self._ats)
+        return self.atom_table.symbols
+    @property
+    def atomic_numbers(self):
+        return self.atom_table.atomic_numbers
     @property
     def masses(self):
-        return np.array([a["Mass"] for a in self._ats])
+        return self.atom_table.masses
+    @masses.setter
+    def masses(self, masses):
+        self._atom_table = self.atom_table.with_masses(masses)
+        self._cache = {}
+    @property
+    def triple_masses(self):
+        """
+        :return: the masses repeated for each Cartesian coordinate
+        :rtype: np.ndarray
+        """
+        return self.atom_table.triple_masses
     @property
     def bonds(self):
         if self._bonds is None and self.guess_bonds:
@@ -134,12 +267,18 @@ class Molecule:
     @property
     def coords(self):
         return self._coords
+    @coords.setter
+    def coords(self, coords):
+        if not isinstance(coords, CoordinateSet):
+            coords = CoordinateSet(coords, self._sys)
+        self._coords = coords
+        self._cache = {}
     @property
     def sys(self):
         return self._coords.system
     @property
     def formula(self):
-        return self.prop('chemical_formula')
+        return self.atom_table.cached('formula', lambda t: self.prop('chemical_formula'))
     @property
     def multiconfig(self):
         return self.coords.multiconfig
@@ -159,6 +298,10 @@ class Molecule:
         if self._pds is None:
             self._pds = self.load_potential_derivatives()
         return self._pds
+    @potential_derivatives.setter
+    def potential_derivatives(self, derivs):
+        self._pds = derivs
+        self._fcs = None if derivs is None or len(derivs) == 1 else derivs[1]
     @property
     def potential_surface(self):
         if self._pes is None:
@@ -176,14 +319,41 @@ class Molecule:
         :return:
         :rtype: CoordinateSet
         """
-        return self.prop('center_of_mass')
+        if 'center_of_mass' not in self._cache:
+            self._cache['center_of_mass'] = self.prop('center_of_mass')
+        return self._cache['center_of_mass']
     @property
     def inertial_axes(self):
         """
+        The principal axes of inertia, shared with `principal_inertia`
+
         :return:
-        :rtype: CoordinateSet
+        :rtype: np.ndarray
         """
-        return self.prop('moments_of_inertia')[1]
+        return self.principal_inertia[1]
+    @property
+    def principal_inertia(self):
+        """
+        The principal moments and axes of inertia about the center of mass, along with the center of mass itself
+
+        :return:
+        :rtype: (np.ndarray, np.ndarray, np.ndarray)
+        """
+        if 'principal_inertia' not in self._cache:
+            self._cache['principal_inertia'] = self.prop('principal_inertia')
+            self._cache.setdefault('center_of_mass', self._cache['principal_inertia'][2])
+        return self._cache['principal_inertia']
+    @property
+    def rotational_constants(self):
+        """
+        The rigid-rotor rotational constants in wavenumbers for every configuration
+
+        :return:
+        :rtype: np.ndarray
+        """
+        if 'rotational_constants' not in self._cache:
+            self._cache['rotational_constants'] = self.prop('rotational_constants')
+        return self._cache['rotational_constants']
     @property
     def internal_coordinates(self):
         if self._ints is None and self._zmat is not None:
@@ -215,29 +385,98 @@ class Molecule:
             ))
         self._normal_modes = modes
 
+    # cached values that have one entry per configuration and so can be sliced along with the coordinates
+    _configuration_cache_keys = ('center_of_mass', 'principal_inertia', 'rotational_constants')
+    def _view(self, coords, cache=None, **changes):
+        """
+        Makes a lightweight molecule that shares the atom table, bonds, surfaces, etc. with this one
+        but has different coordinates.
+        The coordinates are a read-only view (writing goes through the `coords` setter which swaps in a new array)
+        and the embedding for the coordinate system is only computed if it gets used.
+
+        :param coords:
+        :type coords: np.ndarray
+        :param cache: already known coordinate-dependent values
+        :type cache: dict | None
+        :param changes: attributes to change on the view
+        :type changes:
+        :return:
+        :rtype: Molecule
+        """
+        new = object.__new__(type(self))
+        new.__dict__.update(self.__dict__)
+        new.__dict__.update(changes)
+        new._cache = {} if cache is None else cache
+        new._ints = None
+        new._sys = MolecularCartesianCoordinateSystem(new)
+        coords = np.asarray(coords).view()
+        coords.flags.writeable = False
+        new._coords = CoordinateSet(coords, new._sys)
+        return new
+
+    def _sliced_cache(self, spec):
+        cache = {}
+        if self.multiconfig and not isinstance(spec, tuple):
+            # a plain index on a multiconfig molecule only picks out configurations
+            for k in self._configuration_cache_keys:
+                if k in self._cache:
+                    val = self._cache[k]
+                    cache[k] = tuple(v[spec] for v in val) if isinstance(val, tuple) else val[spec]
+        return cache
+
+    def _submolecule_bonds(self, atoms):
+        if self._bonds is None:
+            return None
+        try:
+            bonds = np.asarray(self._bonds, dtype=int)
+        except ValueError: # bonds guessed per configuration
+            return None
+        if bonds.ndim != 2 or len(bonds) == 0:
+            return None
+        remapping = np.full(self.num_atoms, -1)
+        remapping[atoms] = np.arange(len(atoms))
+        bonds = bonds[(remapping[bonds[:, 0]] >= 0) & (remapping[bonds[:, 1]] >= 0)]
+        bonds[:, :2] = remapping[bonds[:, :2]]
+        return bonds
+
     def take_submolecule(self, spec):
         """
         Takes a 'slice' of a molecule if working with Cartesian coords.
         If not, need to do some corner case handling for that.
+        Slices are views that share their data with this molecule, and slices that pick out a subset of the atoms
+        keep the bonds between those atoms but drop anything that only makes sense for the full molecule
+        (potential derivatives, normal modes, etc.)
 
         :param spec:
         :type spec:
         :return:
         :rtype:
         """
-        new_coords = self.coords[spec]
+        new_coords = np.asarray(self.coords)[spec]
         new_shape = new_coords.shape
         cur_shape = self.coords.shape
         # if we're no longer working with Cartesians, then we say "Abort!"
-        if new_shape[-1] != 3:
-            return new_coords
+        if len(new_shape) < 2 or new_shape[-1] != 3:
+            return self.coords[spec]
         elif new_shape[-2] != cur_shape[-2]:
-            # we have a different number of atoms now...
-            raise IndexError("I haven't implemented slicing for molecules that changes the # of atoms")
+            # we have a different number of atoms now, so we figure out which ones by slicing their indices
+            inds = np.broadcast_to(np.arange(cur_shape[-2])[:, np.newaxis], cur_shape)[spec]
+            atoms = inds.reshape((-1,) + new_shape[-2:])[0, :, 0]
+            return self._view(
+                new_coords,
+                _ats=[self._ats[i] for i in atoms],
+                _atom_table=self.atom_table.take(atoms),
+                _bonds=self._submolecule_bonds(atoms),
+                _mol=None,
+                _fcs=None,
+                _pds=None,
+                _dipoles=None,
+                _pes=None,
+                _normal_modes=None,
+                _zmat=None
+            )
         else:
-            new = self.copy()
-            new._coords = new_coords
-            return new
+            return self._view(new_coords, cache=self._sliced_cache(spec))
 
     @property
     def shape(self):
@@ -260,6 +499,8 @@ class Molecule:
         import copy
         # mostly just use the default and don't be fancy
         new = copy.copy(self)
+        # the atom table is immutable so it can be shared, but the coordinate caches can't
+        new._cache = {}
         # but we also need to do some stuff where we store objects that
         # reference the molecule
         if self._normal_modes is not None:
@@ -294,9 +535,8 @@ class Molecule:
         ext = ext.lower()
 
         if ext == ".fchk":
-            from McUtils.GaussianInterface import GaussianFChkReader
-            with GaussianFChkReader(file) as gr:
-                parse = gr.parse(['ForceConstants'])
+            from ..Data.Checkpoints import FChkCache
+            parse = FChkCache.parse(file, ['ForceConstants'])
             return parse["ForceConstants"].array
         elif ext == ".log":
             raise NotImplementedError("{}: support for loading force constants from {} files not there yet".format(
@@ -324,10 +564,9 @@ class Molecule:
         ext = ext.lower()
 
         if ext == ".fchk":
-            from McUtils.GaussianInterface import GaussianFChkReader
+            from ..Data.Checkpoints import FChkCache
             keys= ['Gradient', 'ForceConstants', 'ForceDerivatives']
-            with GaussianFChkReader(file) as gr:
-                parse = gr.parse(keys)
+            parse = FChkCache.parse(file, keys)
 
             return tuple(parse[k] for k in keys)
         elif ext == ".log":
@@ -357,16 +596,16 @@ class Molecule:
         ext = ext.lower()
 
         if ext == ".fchk":
-            from McUtils.GaussianInterface import GaussianFChkReader
-            with GaussianFChkReader(file) as gr:
-                parse = gr.parse(
-                    ['Real atomic weights', 'VibrationalModes', 'ForceConstants', 'VibrationalData']
-                )
+            from ..Data.Checkpoints import FChkCache
+            parse = FChkCache.parse(
+                file,
+                ['Real atomic weights', 'VibrationalModes', 'ForceConstants', 'VibrationalData']
+            )
 
             modes = parse["VibrationalModes"]
             freqs = parse["VibrationalData"]["Frequencies"] * UnitsData.convert("Wavenumbers", "Hartrees")
             masses = parse['Real atomic weights'] * UnitsData.convert("AtomicMassUnits", "ElectronMass")
-            fcs = self.force_constants
+            fcs = parse["ForceConstants"].array
 
             internal_F = np.dot(np.dot(modes, fcs), modes.T)
             raw = np.sqrt(np.diag(internal_F))
@@ -409,7 +648,7 @@ class Molecule:
         :param inverse: whether to return the inverse of the rotations or not
         :type inverse: bool
         :return:
-        :rtype: MolecularTransformation | List[MolecularTransformation]
+        :rtype: MolecularTransformation | StackedMolecularTransformation
         """
         return self.prop('principle_axis_transformation', sel=sel, inverse=inverse)
     def eckart_frame(self, mol, sel=None, inverse=False):
@@ -426,6 +665,20 @@ class Molecule:
         """
         return self.prop('eckart_transformation', mol, sel=sel, inverse=inverse)
 
+    def eckart_embedded_coords(self, mol, sel=None):
+        """
+        Gets the coordinates of the molecule embedded in the Eckart frame of `mol`,
+        vectorized over all configurations
+
+        :param mol: reference molecule
+        :type mol: Molecule
+        :param sel: selection of atoms to use when getting the Eckart frame
+        :type sel:
+        :return:
+        :rtype: CoordinateSet
+        """
+        return self.prop('eckart_embedded_coords', mol, sel=sel)
+
     def get_embedded_molecule(self, ref=None):
         """
         Returns a Molecule embedded in an Eckart frame if ref is not None, otherwise returns
@@ -442,14 +695,16 @@ class Molecule:
         modes = new.normal_modes
         if modes is not None:
             modes = modes.embed(frame)
+            modes.molecule = new
             new.normal_modes = modes
-        pot_d = new.potential_derivatives
+        pot_d = self._dense_potential_derivatives(new.potential_derivatives)
         if pot_d is not None:
-            derivs = [None]*len(pot_d)
-            for i, d in enumerate(pot_d):
-                dim = d.ndim
-                derivs[i] = frame.apply(d)
-            new.potential_derivatives = derivs
+            # only the axes of length 3N are Cartesian, the rest are normal mode axes and don't rotate
+            ncart = 3 * self.num_atoms
+            new.potential_derivatives = tuple(
+                None if d is None else frame.embed_tensor(d, axes=[i for i, n in enumerate(d.shape) if n == ncart])
+                for d in pot_d
+            )
         return new
 
     @classmethod
@@ -484,19 +739,143 @@ class Molecule:
         )
     @classmethod
     def _from_fchk_file(cls, file, **opts):
-        from McUtils.GaussianInterface import GaussianFChkReader
-        with GaussianFChkReader(file) as gr:
-            parse = gr.parse(
-                ['Coordinates', 'AtomicNumbers', 'Integer atomic weights']
-            )
+        from ..Data.Checkpoints import FChkCache
+        parse = FChkCache.parse(
+            file,
+            ['Coordinates', 'AtomicNumbers', 'Integer atomic weights']
+        )
         nums = parse["AtomicNumbers"]
         wts = parse['Integer atomic weights']
         # print(nums, wts)
         mol = cls(
             [AtomData[a]["Symbol"] + str(b) for a, b in zip(nums, wts)],
-            parse["Coordinates"],
+            np.array(parse["Coordinates"]), # the cached block is read-only and the molecule owns its coordinates
+            **opts
+        )
+        return mol
+
+    @staticmethod
+    def _dense_derivative(deriv):
+        # pulls plain arrays out of the various derivative containers we get from the parsers
+        if deriv is None or isinstance(deriv, np.ndarray):
+            return deriv
+        if hasattr(deriv, 'asarray'):
+            return deriv.asarray()
+        if hasattr(deriv, 'array'):
+            return np.asarray(deriv.array)
+        return np.asarray(deriv)
+
+    @classmethod
+    def _dense_potential_derivatives(cls, pds):
+        # splits the packed third/fourth derivative container from the fchk parser
+        # so that we always work with (gradient, force constants, cubics, quartics) arrays
+        if pds is None:
+            return None
+        if len(pds) == 3 and hasattr(pds[2], 'third_deriv_array'):
+            pds = (pds[0], pds[1], pds[2].third_deriv_array, pds[2].fourth_deriv_array)
+        return tuple(cls._dense_derivative(d) for d in pds)
+
+    def save_archive(self, file, derived=True):
+        """
+        Saves the molecule along with its derived data (potential derivatives, normal modes, internal coordinates)
+        to a binary archive that can be reloaded with `Molecule.from_file`
+
+        :param file: the `.npz` file to write to
+        :type file: str
+        :param derived: whether to load any derived data that hasn't been computed yet from the `source_file` before saving
+        :type derived: bool
+        :return:
+        :rtype: str
+        """
+        from ..Data.Archives import NumpyArchive
+
+        load = derived and self.source_file is not None
+        pds = self._dense_potential_derivatives(self.potential_derivatives if load else self._pds)
+        if pds is not None:
+            pds = list(pds) + [None] * (4 - len(pds))
+        else:
+            pds = [None] * 4
+
+        vibs = self.normal_modes if load else self._normal_modes
+        modes = vibs.basis if vibs is not None else None
+        if modes is not None and modes.in_internals:
+            modes = None # internal coordinate modes are rebuilt from the Cartesian ones
+
+        bonds = self._bonds
+        if bonds is not None:
+            try:
+                bonds = np.asarray(bonds, dtype=int)
+            except (TypeError, ValueError):
+                bonds = None
+
+        ints = self.internal_coordinates if (derived or self._ints is not None) else None
+
+        return NumpyArchive.save(
+            file,
+            atoms=np.array(self.atoms),
+            coords=np.asarray(self.coords),
+            bonds=bonds,
+            zmatrix=self._zmat,
+            internal_coordinates=None if ints is None else np.asarray(ints),
+            charge=self._charge,
+            name=self._name,
+            source_file=self.source_file,
+            gradient=pds[0],
+            force_constants=pds[1],
+            cubic_derivatives=pds[2],
+            quartic_derivatives=pds[3],
+            normal_modes=None if modes is None else np.asarray(modes.matrix),
+            normal_mode_inverse=None if modes is None else np.asarray(modes.inverse),
+            normal_mode_frequencies=None if modes is None else np.asarray(modes.freqs)
+        )
+
+    @classmethod
+    def _from_archive_file(cls, file, mmap=True, **opts):
+        """
+        Loads a molecule from an archive written by `save_archive`, memory-mapping the large derivative arrays
+
+        :param file:
+        :type file: str
+        :param mmap: whether to memory-map the large arrays
+        :type mmap: bool
+        :param opts:
+        :type opts:
+        :return:
+        :rtype: Molecule
+        """
+        from ..Data.Archives import NumpyArchive
+        from .Vibrations import MolecularVibrations, MolecularNormalModes
+
+        arch = NumpyArchive(file, mmap=mmap)
+        pds = tuple(arch[k] for k in ('gradient', 'force_constants', 'cubic_derivatives', 'quartic_derivatives') if k in arch)
+        for k in ('bonds', 'zmatrix', 'charge', 'name', 'source_file'):
+            # we prefer the original source file so that anything missing from the archive can still be loaded
+            if k in arch and (k not in opts or k == 'source_file'):
+                val = arch[k]
+                if val.ndim == 0:
+                    val = val.item()
+                elif k == 'bonds':
+                    val = val.tolist()
+                opts[k] = val
+        mol = cls(
+            list(arch['atoms']),
+            arch['coords'],
+            potential_derivatives=pds if len(pds) > 0 else None,
             **opts
         )
+        if 'internal_coordinates' in arch and mol._zmat is not None:
+            mol._ints = CoordinateSet(
+                arch['internal_coordinates'],
+                MolecularZMatrixCoordinateSystem(mol, ordering=mol._zmat)
+            )
+        if 'normal_modes' in arch:
+            modes = MolecularNormalModes(
+                mol,
+                arch['normal_modes'],
+                inverse=arch['normal_mode_inverse'],
+                freqs=arch['normal_mode_frequencies']
+            )
+            mol.normal_modes = MolecularVibrations(mol, modes)
         return mol
 
     @classmethod
@@ -513,7 +892,8 @@ class Molecule:
         opts['source_file'] = file
         format_dispatcher = {
             "log": cls._from_log_file,
-            "fchk": cls._from_fchk_file
+            "fchk": cls._from_fchk_file,
+            "npz": cls._from_archive_file
         }
 
         if mode == None:
@@ -536,6 +916,149 @@ class Molecule:
                 mol = next(pybel.readfile(mode, file))
                 return cls.from_pybel(mol)
 
+    @staticmethod
+    def _iter_xyz_frames(file, chunk_size, units="Angstroms"):
+        """
+        Streams chunks of frames out of a (possibly multi-frame) XYZ file
+
+        :param file:
+        :type file: str
+        :param chunk_size:
+        :type chunk_size: int
+        :param units: the units the coordinates are stored in
+        :type units: str
+        :return: pairs of atoms and coordinates in Bohr
+        :rtype: Iterator[(list[str], np.ndarray)]
+        """
+        conv = 1 if units == "AtomicUnitOfLength" else UnitsData.convert(units, "AtomicUnitOfLength")
+        atoms = None
+        with open(file) as xyz:
+            block = []
+            for line in xyz:
+                line = line.strip()
+                if len(line) == 0:
+                    continue
+                num_atoms = int(line.split()[0])
+                next(xyz) # comment line
+                lines = [next(xyz).split() for _ in range(num_atoms)]
+                if atoms is None:
+                    atoms = [l[0] for l in lines]
+                elif num_atoms != len(atoms):
+                    raise MolecoolException("{}: frame with {} atoms found in trajectory with {}".format(
+                        file, num_atoms, len(atoms)
+                    ))
+                block.extend(l[1:4] for l in lines)
+                if len(block) == chunk_size * num_atoms:
+                    yield atoms, conv * np.array(block, dtype=float).reshape((chunk_size, num_atoms, 3))
+                    block = []
+            if len(block) > 0:
+                yield atoms, conv * np.array(block, dtype=float).reshape((-1, len(atoms), 3))
+
+    @staticmethod
+    def _iter_log_frames(file, chunk_size):
+        """
+        Streams chunks of standard orientation geometries out of a Gaussian log file.
+        Every chunk is a `GaussianLogReader` parse of at most `chunk_size` blocks that picks up where the last one stopped,
+        so we parse exactly what `_from_log_file` does without ever holding the whole scan.
+
+        :param file:
+        :type file: str
+        :param chunk_size:
+        :type chunk_size: int
+        :return: pairs of atomic numbers and coordinates in Bohr
+        :rtype: Iterator[(list[int], np.ndarray)]
+        """
+        from McUtils.GaussianInterface import GaussianLogReader
+
+        ang2bohr = UnitsData.convert("Angstroms", "AtomicUnitOfLength")
+        with GaussianLogReader(file) as gr:
+            while True:
+                parse = gr.parse('StandardCartesianCoordinates', num=chunk_size, reset=False)
+                block = parse['StandardCartesianCoordinates']
+                if block is None:
+                    break
+                spec, coords = block
+                if coords is None or len(coords) == 0:
+                    break
+                yield [int(a[1]) for a in spec], ang2bohr*np.array(coords)
+                if len(coords) < chunk_size:
+                    break
+
+    @staticmethod
+    def _iter_archive_frames(file, chunk_size):
+        """
+        Streams chunks of configurations out of the memory-mapped coordinates of an archive written by `save_archive`
+
+        :param file:
+        :type file: str
+        :param chunk_size:
+        :type chunk_size: int
+        :return: pairs of atoms and coordinates in Bohr
+        :rtype: Iterator[(list[str], np.ndarray)]
+        """
+        from ..Data.Archives import NumpyArchive
+
+        arch = NumpyArchive(file, mmap=True, mmap_threshold=0)
+        atoms = list(arch['atoms'])
+        coords = arch['coords']
+        if coords.ndim == 2:
+            coords = coords[np.newaxis]
+        for start in range(0, len(coords), chunk_size):
+            # only the current chunk ever gets read off disk
+            yield atoms, np.array(coords[start:start+chunk_size])
+
+    @classmethod
+    def iter_file(cls, file, chunk_size=1000, mode=None, **opts):
+        """
+        Streams a multi-configuration file as a sequence of molecules over fixed-size chunks of frames,
+        so that trajectories and scans too large to hold in memory can be processed chunk by chunk.
+        Every chunk shares the same atom data and bonds.
+
+        :param file: the trajectory file (XYZ, Gaussian log, or a `.npz` archive)
+        :type file: str
+        :param chunk_size: the number of configurations per chunk
+        :type chunk_size: int
+        :param mode: the file type, inferred from the extension by default
+        :type mode: str | None
+        :param opts: options for the `Molecule` constructor (and `units` for XYZ files)
+        :type opts:
+        :return:
+        :rtype: Iterator[Molecule]
+        """
+        import os
+
+        format_dispatcher = {
+            "xyz": cls._iter_xyz_frames,
+            "log": cls._iter_log_frames,
+            "npz": cls._iter_archive_frames
+        }
+
+        if mode == None:
+            path, ext = os.path.splitext(file)
+            ext = ext.lower()
+            mode = ext.strip(".")
+        if mode not in format_dispatcher:
+            raise ValueError("{}: can't stream frames from file type {}".format(cls.__name__, mode))
+        reader_opts = {}
+        if mode == "xyz" and 'units' in opts:
+            reader_opts['units'] = opts.pop('units')
+
+        opts['source_file'] = file
+        ats = None
+        for atoms, coords in format_dispatcher[mode](file, chunk_size, **reader_opts):
+            if ats is None:
+                mol = cls(atoms, coords, **opts)
+                ats = mol._ats
+                if mol._bonds is None and mol.guess_bonds:
+                    # bonds are guessed once from the first frame and shared from then on
+                    mol._bonds = mol[0].bonds.tolist()
+                opts['bonds'] = mol._bonds
+            else:
+                mol = cls(ats, coords, **opts)
+                mol._atom_table = table
+            table = mol.atom_table
+            yield mol
+
     def plot(self,
              *geometries,
              figure = None,
@@ -562,7 +1085,7 @@ class Molecule:
             figure = Graphics3D(**plot_ops)
 
         colors = [ at["IconColor"] for at in self._ats ]
-        radii = [ atom_radius_scaling * at["IconRadius"] for at in self._ats ]
+        radii = atom_radius_scaling * self.atom_table.radii
 
         bonds = [None] * len(geometries)
         atoms = [None] * len(geometries)
@@ -7,7 +7,7 @@ from McUtils.Coordinerds import CoordinateSet
 from McUtils.Data import AtomData, UnitsData, BondData
 
 from .Molecule import Molecule
-from .Transformations import MolecularTransformation
+from .Transformations import MolecularTransformation, StackedMolecularTransformation
 
 __all__ = [
     "MolecularProperties",
@@ -41,6 +41,9 @@ class MolecularProperties:
         :rtype:
         """
 
+        masses = np.asarray(masses)
+        if masses.ndim > 1:
+            return np.einsum('...i,...ia->...a', masses, coords) / np.sum(masses, axis=-1)[..., np.newaxis]
         return np.tensordot(masses / np.sum(masses), coords, axes=[0, -2])
 
     @classmethod
@@ -71,7 +74,11 @@ class MolecularProperties:
         diag = nput.vec_dots(coords, coords)
         d[..., (0, 1, 2), (0, 1, 2)] = diag[..., np.newaxis]
         o = nput.vec_outer(coords, coords, axes=[-1, -1])
-        tens = np.tensordot(masses, d - o, axes=[0, -3])
+        masses = np.asarray(masses)
+        if masses.ndim > 1:
+            tens = np.einsum('...i,...iab->...ab', masses, d - o)
+        else:
+            tens = np.tensordot(masses, d - o, axes=[0, -3])
 
         return tens
 
@@ -97,7 +104,11 @@ class MolecularProperties:
         else:
             multiconfig = True
             extra_shape = coords.shape[:-2]
-            coords = coords.reshape((np.product(extra_shape),) + coords.shape[-2:])
+            coords = coords.reshape((np.prod(extra_shape, dtype=int),) + coords.shape[-2:])
+        masses = np.asarray(masses)
+        if masses.ndim > 1:
+            # one set of masses per configuration
+            masses = masses.reshape((-1, masses.shape[-1]))
 
         massy_doop = cls.get_prop_inertia_tensors(coords, masses)
         moms, axes = np.linalg.eigh(massy_doop)
@@ -123,38 +134,110 @@ class MolecularProperties:
 
         return cls.get_prop_moments_of_inertia(mol.coords, mol.masses)
 
+    @classmethod
+    def get_prop_principal_inertia(cls, coords, masses):
+        """
+        Computes the principal moments and axes of inertia about the center of mass for one or many configurations,
+        diagonalizing every inertia tensor in a single `eigh` call.
+        This is what every other inertia-based property (embedding axes, rotational constants, the translation-rotation projector) is built on.
+
+        :param coords:
+        :type coords: np.ndarray
+        :param masses: (n,) masses or (..., n) masses for each configuration
+        :type masses: np.ndarray
+        :return: the (..., 3) moments, (..., 3, 3) axes, and (..., 3) centers of mass
+        :rtype: (np.ndarray, np.ndarray, np.ndarray)
+        """
+
+        coords = np.asarray(coords, dtype=float)
+        masses = np.asarray(masses, dtype=float)
+        if masses.ndim > 1:
+            stack_shape = np.broadcast_shapes(coords.shape[:-2], masses.shape[:-1])
+            coords = np.broadcast_to(coords, stack_shape + coords.shape[-2:])
+            masses = np.broadcast_to(masses, stack_shape + masses.shape[-1:])
+        com = cls.get_prop_center_of_mass(coords, masses)
+        moms, axes = cls.get_prop_moments_of_inertia(coords - com[..., np.newaxis, :], masses)
+        return moms, axes, com
+
+    @classmethod
+    def principal_inertia(cls, mol):
+        """
+
+        :param mol:
+        :type mol: Molecule
+        :return:
+        :rtype: (np.ndarray, np.ndarray, np.ndarray)
+        """
+        return cls.get_prop_principal_inertia(mol.coords, mol.masses)
+
+    @classmethod
+    def get_prop_rotational_constants(cls, coords, masses, units="Wavenumbers", moments=None):
+        """
+        Computes the rigid-rotor rotational constants (1/2I) for one or many configurations.
+        Rotations with no moment of inertia (e.g. about the axis of a linear molecule) get infinite constants.
+
+        :param coords: coordinates in Bohr
+        :type coords: np.ndarray
+        :param masses: masses in amu
+        :type masses: np.ndarray
+        :param units: the energy units for the constants
+        :type units: str
+        :param moments: already computed principal moments of inertia, to skip the diagonalization
+        :type moments: np.ndarray | None
+        :return: (..., 3) rotational constants, ordered like the principal moments
+        :rtype: np.ndarray
+        """
+
+        if moments is None:
+            moments = cls.get_prop_principal_inertia(coords, masses)[0]
+        moments = np.asarray(moments) * UnitsData.convert("AtomicMassUnits", "AtomicUnitOfMass")
+        consts = np.full(moments.shape, np.inf)
+        pos = moments > 1e-8 * np.max(moments, axis=-1, keepdims=True)
+        consts[pos] = 1 / (2 * moments[pos])
+        if units != "Hartrees":
+            consts = consts * UnitsData.convert("Hartrees", units)
+        return consts
+
+    @classmethod
+    def rotational_constants(cls, mol, units="Wavenumbers"):
+        """
+
+        :param mol:
+        :type mol: Molecule
+        :return:
+        :rtype: np.ndarray
+        """
+        return cls.get_prop_rotational_constants(mol.coords, mol.masses, units=units, moments=mol.principal_inertia[0])
+
     @classmethod
     def get_prop_principle_axis_rotation(cls, coords, masses, sel=None, inverse=False):
         """
-        Generates the principle axis transformation for a set of coordinates and positions
+        Generates the principle axis transformation for a set of coordinates and positions.
+        Multiple configurations are handled in one batch and returned as a single stack of transformations
 
         :param coords:
         :type coords: CoordinateSet
         :param masses:
         :type masses: np.ndarray
         :return:
-        :rtype: MolecularTransformation | List[MolecularTransformation]
+        :rtype: MolecularTransformation | StackedMolecularTransformation
         """
 
         multiconf = coords.multiconfig
-        transforms = [None]*(1 if not multiconf else len(coords))
         if sel is not None:
             coords = coords[..., sel, :]
             masses = masses[sel]
-        if multiconf:
-            coords = list(coords)
+        coords = np.asarray(coords)
+        if not multiconf:
+            coords = coords[np.newaxis]
         else:
-            coords = [coords]
-        mass = masses
-        for i,c in enumerate(coords):
-            com = cls.get_prop_center_of_mass(c, mass)
-            transf = MolecularTransformation(-com)
-            c = transf(c)
-            moms, axes = cls.get_prop_moments_of_inertia(c, mass)
-            if inverse:
-                axes = axes.T
-            transf = MolecularTransformation(axes)(transf)
-            transforms[i] = transf
+            coords = coords.reshape((-1,) + coords.shape[-2:])
+
+        moms, axes, com = cls.get_prop_principal_inertia(coords, masses)
+        if inverse:
+            axes = axes.transpose(0, 2, 1)
+        shifts = -np.einsum('nab,nb->na', axes, com)
+        transforms = StackedMolecularTransformation.from_parts(axes, shifts)
 
         if not multiconf:
             transforms = transforms[0]
@@ -196,6 +279,7 @@ class MolecularProperties:
             ref = ref[..., sel, :]
         transforms = cls.get_prop_principle_axis_rotation(coords, masses)
         if multiconf:
+            transforms = list(transforms)
             coords = list(coords)
         else:
             coords = [coords]
@@ -258,6 +342,224 @@ class MolecularProperties:
             ))
         return cls.get_prop_eckart_transformation(m1, ref_mol.coords, mol.coords, sel=sel, inverse=inverse)
 
+    @classmethod
+    def get_prop_eckart_rotations(cls, masses, ref, coords, sel=None, inverse=False):
+        """
+        Computes the Eckart rotations for a set of configurations in a single batch.
+        Rather than building a `MolecularTransformation` per configuration, every pair-wise product matrix is
+        built at once and a single stacked SVD is used to get the rotations, which map the
+        center-of-mass shifted `coords` onto the center-of-mass shifted `ref`
+
+        :param masses:
+        :type masses: np.ndarray
+        :param ref: reference geometry
+        :type ref: np.ndarray
+        :param coords: geometries to rotate, either a single configuration or a stack of them
+        :type coords: np.ndarray
+        :param sel: selection of atoms to use when getting the Eckart frame
+        :type sel:
+        :param inverse: whether to return the inverse of the rotations or not
+        :type inverse: bool
+        :return: rotations with shape (n_configs, 3, 3), the reference center of mass, and the centers of mass of the configurations
+        :rtype: (np.ndarray, np.ndarray, np.ndarray)
+        """
+
+        coords = np.asarray(coords)
+        ref = np.asarray(ref)
+        masses = np.asarray(masses)
+        multiconf = coords.ndim > 2
+        if not multiconf:
+            coords = coords[np.newaxis]
+        else:
+            coords = coords.reshape((-1,) + coords.shape[-2:])
+        if sel is not None:
+            coords = coords[:, sel, :]
+            ref = ref[sel, :]
+            masses = masses[sel]
+
+        weights = masses / np.sum(masses)
+        ref_com = np.dot(weights, ref)
+        coms = np.tensordot(coords, weights, axes=[1, 0])
+        ref = ref - ref_com[np.newaxis]
+        coords = coords - coms[:, np.newaxis, :]
+
+        # generate all of the pair-wise product matrices and take their SVDs at once
+        A = np.einsum('i,ia,nib->nab', weights, ref, coords)
+        U, S, V = np.linalg.svd(A)
+        # flip the last singular vector where needed so we always get proper rotations,
+        # which also takes care of planar structures where A only has rank 2
+        dets = np.sign(np.linalg.det(U @ V))
+        dets[dets == 0] = 1
+        U[:, :, 2] *= dets[:, np.newaxis]
+        rots = U @ V
+        if inverse:
+            rots = rots.transpose(0, 2, 1)
+
+        return rots, ref_com, coms
+
+    @classmethod
+    def eckart_rotations(cls, mol, ref_mol, sel=None, inverse=False):
+        """
+        Computes the batched Eckart rotations of a Molecule onto a reference geometry
+
+        :param mol: molecules to get Eckart rotations for
+        :type mol: Molecule
+        :param ref_mol: reference geometry
+        :type ref_mol: Molecule
+        :param sel: coordinate selection to use when doing the Eckart stuff
+        :type sel:
+        :return: rotations with shape (n_configs, 3, 3)
+        :rtype: np.ndarray
+        """
+        m1 = ref_mol.masses
+        m2 = mol.masses
+        if not np.all(m1 == m2):
+            raise ValueError("Eckart reference has different masses from scan ({}) vs. ({})".format(
+                m1,
+                m2
+            ))
+        rots, ref_com, coms = cls.get_prop_eckart_rotations(m1, ref_mol.coords, mol.coords, sel=sel, inverse=inverse)
+        return rots
+
+    @classmethod
+    def get_prop_eckart_embedded_coords(cls, masses, ref, coords, sel=None):
+        """
+        Embeds a set of configurations in the Eckart frame of `ref` with a single `einsum`
+
+        :param masses:
+        :type masses: np.ndarray
+        :param ref: reference geometry
+        :type ref: np.ndarray
+        :param coords: geometries to embed, either a single configuration or a stack of them
+        :type coords: np.ndarray
+        :param sel: selection of atoms to use when getting the Eckart frame
+        :type sel:
+        :return: the embedded coordinates and the rotations used to embed them
+        :rtype: (np.ndarray, np.ndarray)
+        """
+
+        coords = np.asarray(coords)
+        rots, ref_com, coms = cls.get_prop_eckart_rotations(masses, ref, coords, sel=sel)
+        base_shape = coords.shape
+        coords = coords.reshape((-1,) + base_shape[-2:])
+        embedded = np.einsum('nab,nib->nia', rots, coords - coms[:, np.newaxis, :]) + ref_com[np.newaxis, np.newaxis]
+        embedded = embedded.reshape(base_shape)
+        if len(base_shape) == 2:
+            rots = rots[0]
+        else:
+            rots = rots.reshape(base_shape[:-2] + (3, 3))
+        return embedded, rots
+
+    @classmethod
+    def eckart_embedded_coords(cls, mol, ref_mol, sel=None):
+        """
+        Embeds the coordinates of a Molecule in the Eckart frame of a reference geometry
+
+        :param mol: molecules to embed
+        :type mol: Molecule
+        :param ref_mol: reference geometry
+        :type ref_mol: Molecule
+        :param sel: coordinate selection to use when doing the Eckart stuff
+        :type sel:
+        :return:
+        :rtype: CoordinateSet
+        """
+        m1 = ref_mol.masses
+        m2 = mol.masses
+        if not np.all(m1 == m2):
+            raise ValueError("Eckart reference has different masses from scan ({}) vs. ({})".format(
+                m1,
+                m2
+            ))
+        crds, rots = cls.get_prop_eckart_embedded_coords(m1, ref_mol.coords, mol.coords, sel=sel)
+        return CoordinateSet(crds, mol.coords.system)
+
+    _transrot_cache = {}
+    _transrot_cache_size = 32 # only single configurations get cached, so this bounds the cache at 32 (3n, 3n) projectors
+
+    @classmethod
+    def clear_translation_rotation_cache(cls):
+        """
+        Drops all of the cached translation-rotation projectors
+        """
+        cls._transrot_cache.clear()
+
+    @classmethod
+    def get_prop_translation_rotation_projector(cls, coords, masses, tol=1e-8):
+        """
+        Returns orthonormal mass-weighted translation/rotation vectors for one or many configurations along with
+        the projector onto the complementary (vibrational) space.
+        The rotations are taken about the principal axes, where they are already orthogonal to each other and to the translations,
+        so everything is built directly from `get_prop_principal_inertia` without any other decompositions.
+        Results for single configurations are cached per geometry so repeated normal mode analyses don't rebuild them,
+        batches are always recomputed (see `clear_translation_rotation_cache` to empty the cache).
+
+        :param coords: (..., n, 3) coordinates
+        :type coords: np.ndarray
+        :param masses: (..., n) masses
+        :type masses: np.ndarray
+        :param tol: moment of inertia (relative to the largest) below which a rotation counts as missing
+        :type tol: float
+        :return: the (..., 3n, k) translation-rotation vectors, the (..., k) moments of inertia for the rotations, and the (..., 3n, 3n) vibrational projector
+        :rtype: (np.ndarray, np.ndarray, np.ndarray)
+        """
+
+        coords = np.asarray(coords, dtype=float)
+        masses = np.asarray(masses, dtype=float)
+        cache = coords.ndim == 2 and masses.ndim == 1
+        if cache:
+            key = (coords.shape, coords.tobytes(), masses.tobytes(), tol)
+            if key in cls._transrot_cache:
+                return cls._transrot_cache[key]
+
+        n = coords.shape[-2]
+        mT = np.sum(masses, axis=-1)
+        moms, axes, com = cls.get_prop_principal_inertia(coords, masses)
+        shift_crds = coords - com[..., np.newaxis, :]
+
+        # linear configurations have no rotation about the smallest axis (and atoms have none at all)
+        scale = np.max(moms, axis=-1)
+        ranks = np.sum(moms > tol * np.where(scale > 0, scale, 1)[..., np.newaxis], axis=-1)
+        nrot = np.max(ranks)
+        if np.any(ranks != nrot):
+            raise MolecularPropertyError("{}: configurations have different numbers of rotations ({}), so they can't be stacked".format(
+                'get_prop_translation_rotation_projector',
+                np.unique(ranks)
+            ))
+        moms = moms[..., 3-nrot:]
+        axes = axes[..., :, 3-nrot:]
+
+        # translations: sqrt(m_i/M) e_a and rotations: sqrt(m_i/I_k) (u_k x r_i)
+        sqm = np.sqrt(masses)
+        trans = (sqm / np.sqrt(mT)[..., np.newaxis])[..., :, np.newaxis, np.newaxis] * np.eye(3)
+        rots = np.einsum('abc,...bk,...ic->...iak', nput.levi_cevita3, axes, shift_crds)
+        rots = rots * sqm[..., :, np.newaxis, np.newaxis] / np.sqrt(moms)[..., np.newaxis, np.newaxis, :]
+        stack_shape = np.broadcast_shapes(trans.shape[:-3], rots.shape[:-3])
+        trans = np.broadcast_to(trans, stack_shape + (n, 3, 3))
+        rots = np.broadcast_to(rots, stack_shape + (n, 3, nrot))
+        vecs = np.concatenate([trans, rots], axis=-1)
+        vecs = vecs.reshape(vecs.shape[:-3] + (3*n, 3+nrot))
+        proj = np.eye(3*n) - vecs @ np.swapaxes(vecs, -1, -2)
+
+        if cache:
+            for a in (vecs, moms, proj):
+                a.flags.writeable = False
+            if len(cls._transrot_cache) >= cls._transrot_cache_size:
+                cls._transrot_cache.pop(next(iter(cls._transrot_cache)))
+            cls._transrot_cache[key] = (vecs, moms, proj)
+        return vecs, moms, proj
+
+    @classmethod
+    def translation_rotation_projector(cls, mol, tol=1e-8):
+        """
+
+        :param mol:
+        :type mol: Molecule
+        :return:
+        :rtype: (np.ndarray, np.ndarray, np.ndarray)
+        """
+        return cls.get_prop_translation_rotation_projector(mol.coords, mol.masses, tol=tol)
+
     @classmethod
     def get_prop_translation_rotation_eigenvectors(cls, coords, masses):
         """
@@ -272,32 +574,14 @@ class MolecularProperties:
         :rtype:
         """
 
-        n = len(masses)
-        mT = np.sum(masses)
-        mvec = np.sqrt(masses)
-        com = cls.get_prop_center_of_mass(coords, masses)
-        shift_crds = coords - com[np.newaxis, :]
-        M = np.kron(mvec/mT, np.eye(3)).T # translation eigenvectors
-        mom_rot, ax_rot = cls.get_prop_moments_of_inertia(shift_crds, masses)
-        inv_rot_2 = np.dot(ax_rot.T, np.diag(1/np.sqrt(mom_rot)), ax_rot)
-        e = nput.levi_cevita3
-        R = np.dot(shift_crds, np.dot(inv_rot_2, e).transpose((1, 2, 0))).reshape((3*n, 3)) # rotations
+        vecs, moms, _ = cls.get_prop_translation_rotation_projector(coords, masses)
         freqs = np.concatenate([
-            [1e-14, 1e-14, 1e-14],
-            UnitsData.convert("Wavenumbers", "Hartrees")*(1/mom_rot)
+            np.full(moms.shape[:-1] + (3,), 1e-14),
+            UnitsData.convert("Wavenumbers", "Hartrees")*(1/moms)
             # this isn't right, I'm totally aware, but I think the frequency is supposed to be zero anyway and this
             # will be tiny
-        ])
-        eigs = np.concatenate([M, R], axis=1)
-
-        np.savetxt("/Users/Mark/Desktop/tr_crd.data", coords)
-        np.savetxt("/Users/Mark/Desktop/tr_mass.data", masses)
-        np.savetxt("/Users/Mark/Desktop/tr_eigv.data", eigs)
-
-        # import McUtils.Plots as plt
-        # plt.ArrayPlot(eigs).show()
-        # raise Exception([M, R])
-        return freqs, eigs
+        ], axis=-1)
+        return freqs, vecs
     @classmethod
     def translation_rotation_eigenvectors(cls, mol, sel=None):
         """
@@ -363,13 +647,10 @@ class MolecularProperties:
         else:
             adj_mat = cls.get_prop_adjacency_matrix(atoms, bonds)
 
+        from .Fragments import FragmentTracker
+
         ngroups, labels = sp.csgraph.connected_components(adj_mat)
-        def pull(l, i):
-            w = np.where(labels==i)
-            if len(w) > 0:
-                w = w[0]
-            return w
-        return [pull(labels, i) for i in range(ngroups)]
+        return FragmentTracker.split_labels(labels, ngroups)
 
     @classmethod
     def fragments(cls, mol):
@@ -408,6 +689,43 @@ class MolecularProperties:
             )
         return frags
 
+    @classmethod
+    def get_prop_fragment_indices(cls, coords, elements, tol=1.05, skin=.5):
+        """
+        Returns the fragments in one or many configurations as arrays of atom indices.
+        Configurations are run through a `FragmentTracker` so the connected components only get recomputed
+        when the bonding actually changes between consecutive frames
+
+        :param coords: coordinates for a single configuration or a stack of them
+        :type coords: np.ndarray
+        :param elements: element symbols for the atoms
+        :type elements: Iterable[str]
+        :param tol: the tolerance relative to the single-bond length
+        :type tol: float
+        :param skin: the neighbor list skin passed to the tracker
+        :type skin: float
+        :return:
+        :rtype: list[np.ndarray] | list[list[np.ndarray]]
+        """
+        from .Fragments import FragmentTracker
+
+        coords = np.asarray(coords)
+        tracker = FragmentTracker(elements, tol=tol, skin=skin)
+        if coords.ndim == 2:
+            return tracker.update(coords)
+        return list(tracker.track(coords))
+
+    @classmethod
+    def fragment_indices(cls, mol, tol=1.05, skin=.5):
+        """
+
+        :param mol:
+        :type mol: Molecule
+        :return:
+        :rtype: list[np.ndarray] | list[list[np.ndarray]]
+        """
+        return cls.get_prop_fragment_indices(mol.coords, mol.atom_table.element_symbols, tol=tol, skin=skin)
+
     @classmethod
     def get_prop_zmat_ordering(cls, atoms, bonds):
         """
@@ -446,67 +764,124 @@ class MolecularProperties:
         conn = cls.get_prop_connectivity(atoms, adj)
         # TODO: finish this off for real
 
+    _bond_table_cache = {}
     @classmethod
-    def guessed_bonds(cls, mol, tol=1.05, guess_type=True):
+    def get_prop_bond_cutoff_table(cls, elements):
         """
-        Guesses the bonds for the molecule by finding the ones that are less than some percentage of a single bond for that
-        pair of elements
+        Gets the table of reference single, double, and triple bond lengths for every pair of
+        the passed element types. Tables are cached per element set so they only get built once.
 
-        :return:
-        :rtype:
+        :param elements: the distinct elements in the system
+        :type elements: Iterable[str]
+        :return: (3, n_elements, n_elements) array of bond lengths with `inf` where there's no data
+        :rtype: np.ndarray
         """
 
-        if mol.multiconfig:
-            coords = list(np.asarray(mol.coords))
+        elements = tuple(elements)
+        if elements not in cls._bond_table_cache:
+            table = np.full((3, len(elements), len(elements)), np.inf)
+            for (i, a1), (j, a2) in ip.combinations_with_replacement(enumerate(elements), 2):
+                for o in range(3):
+                    d = BondData.get_distance((a1, a2, o + 1), default=-1)
+                    if d is not None and d > 0:
+                        table[o, i, j] = d
+                        table[o, j, i] = d
+            cls._bond_table_cache[elements] = table
+        return cls._bond_table_cache[elements]
+
+    @classmethod
+    def get_prop_guessed_bonds(cls, coords, elements, tol=1.05, guess_type=True):
+        """
+        Guesses bonds for one or many configurations by finding pairs of atoms that are closer than
+        `tol` times the reference single-bond length for that pair of elements.
+        Candidate pairs come from a single KD-tree neighbor search over every configuration,
+        so the cost scales with the number of neighbors rather than the number of atom pairs
+
+        :param coords: coordinates for a single configuration or a stack of them
+        :type coords: np.ndarray
+        :param elements: element symbols for the atoms
+        :type elements: Iterable[str]
+        :param tol: the tolerance relative to the single-bond length
+        :type tol: float
+        :param guess_type: whether to classify the bond order
+        :type guess_type: bool
+        :return: a (n_bonds, 3) array of (atom, atom, order) for each configuration
+        :rtype: np.ndarray | list[np.ndarray]
+        """
+        from scipy.spatial import cKDTree
+
+        coords = np.asarray(coords)
+        multiconfig = coords.ndim > 2
+        if not multiconfig:
+            coords = coords[np.newaxis]
+        n_frames, n_atoms = coords.shape[:2]
+
+        uniq, el_inds = np.unique(np.asarray(elements), return_inverse=True)
+        table = cls.get_prop_bond_cutoff_table(uniq)
+        singles = table[0]
+        finite = np.isfinite(singles)
+        if not finite.any():
+            empty = [np.zeros((0, 3), dtype=int) for _ in range(n_frames)]
+            return empty if multiconfig else empty[0]
+        cutoff = tol * np.max(singles[finite])
+
+        # put the frames side-by-side far enough apart that no pairs can be found between them
+        # so that one tree covers every configuration
+        mins = np.min(coords[:, :, 0], axis=1)
+        span = np.max(np.max(coords[:, :, 0], axis=1) - mins)
+        stride = span + 2 * cutoff
+        pts = coords.copy()
+        pts[:, :, 0] += np.arange(n_frames)[:, np.newaxis] * stride - mins[:, np.newaxis]
+        pairs = cKDTree(pts.reshape(-1, 3)).query_pairs(cutoff, output_type='ndarray')
+        if len(pairs) == 0:
+            pairs = np.zeros((0, 2), dtype=int)
+
+        frames = pairs[:, 0] // n_atoms
+        a1 = pairs[:, 0] % n_atoms
+        a2 = pairs[:, 1] % n_atoms
+        swap = a1 > a2
+        a1[swap], a2[swap] = a2[swap], a1[swap].copy()
+        e1 = el_inds[a1]
+        e2 = el_inds[a2]
+        dists = np.linalg.norm(coords[frames, a1] - coords[frames, a2], axis=1)
+
+        refs = table[:, e1, e2] # (3, n_pairs)
+        bonded = dists < tol * refs[0]
+        frames = frames[bonded]; a1 = a1[bonded]; a2 = a2[bonded]
+        dists = dists[bonded]; refs = refs[:, bonded]
+        if guess_type:
+            # pick the shortest reference bond that the distance still falls under
+            ok = dists[np.newaxis] < tol * refs
+            orders = np.argmin(np.where(ok, refs, np.inf), axis=0) + 1
         else:
-            coords = [np.asarray(mol.coords)]
-        guessed_bonds = [None] * len(coords)
-        for i, coord in enumerate(coords):
-            # TODO: generalize this to work for multiple configurations at once
-            cds = coord[:, np.newaxis]
-            dist_mat = np.linalg.norm(cds - cds.transpose(1, 0, 2), axis=2)
-            atoms = np.array([a["ElementSymbol"] for a in mol._ats])
-            pair_dists = np.array(
-                [BondData.get_distance((a1, a2, 1), default=-1) for a1, a2 in ip.product(atoms, atoms)]).reshape(
-                len(atoms), len(atoms)
-            )
-            pair_dists[np.tril_indices_from(pair_dists)] = -1
-
-            pair_dists *= tol
-            pos = np.array(np.where(dist_mat < pair_dists)).T
-
-            if len(pos) == 0:
-                return []
-
-            if guess_type:
-                bonds = [None] * len(pos)
-                for i, ats in enumerate(pos):
-                    a1, a2 = ats
-                    test_data = BondData[atoms[a1], atoms[a2], None]
-                    key = None
-                    ref = 100
-                    dist = dist_mat[a1, a2]
-                    for t, d in test_data.items():
-                        if dist < tol * d and d < ref:
-                            ref = d
-                            key = t
-                    if key == "Single":
-                        key = 1
-                    elif key == "Double":
-                        key = 2
-                    elif key == "Triple":
-                        key = 3
-                    bonds[i] = [a1, a2, key]
-            else:
-                bonds = np.column_stack(pos, np.full((len(pos), 1), 1))
+            orders = np.ones(len(a1), dtype=int)
 
-            guessed_bonds[i] = bonds
+        sorting = np.lexsort((a2, a1, frames))
+        bonds = np.column_stack([a1, a2, orders])[sorting]
+        splits = np.searchsorted(frames[sorting], np.arange(1, n_frames))
+        bonds = np.split(bonds, splits)
 
         # TODO: should maybe put some valence checker in here?
-        if not mol.multiconfig:
-            guessed_bonds = guessed_bonds[0]
+        if not multiconfig:
+            bonds = bonds[0]
+        return bonds
 
-        return guessed_bonds
+    @classmethod
+    def guessed_bonds(cls, mol, tol=1.05, guess_type=True):
+        """
+        Guesses the bonds for the molecule by finding the ones that are less than some percentage of a single bond for that
+        pair of elements
+
+        :return: `[atom, atom, order]` lists for the molecule (or for each configuration)
+        :rtype: list
+        """
+
+        atoms = mol.atom_table.element_symbols
+        bonds = cls.get_prop_guessed_bonds(np.asarray(mol.coords), atoms, tol=tol, guess_type=guess_type)
+        if isinstance(bonds, list): # one array per configuration
+            return [b.tolist() for b in bonds]
+        else:
+            return bonds.tolist()
 
     @classmethod
     def get_prop_chemical_formula(cls, atoms):
@@ -2,9 +2,15 @@
 Defines a MolecularTransformation class that uses Coordinerds to describe a physical transformation of a molecule
 Then it layers some common transformations on top of that
 """
+import numpy as np
 from .Molecule import Molecule
 from McUtils.Coordinerds import CoordinateSet, CoordinateTransform
 
+__all__ = [
+    "MolecularTransformation",
+    "StackedMolecularTransformation"
+]
+
 class MolecularTransformation(CoordinateTransform):
     def apply(self, mol):
         """
@@ -18,9 +24,9 @@ class MolecularTransformation(CoordinateTransform):
             new_coords = super().apply(mol.coords)
             new = mol.copy()
             if isinstance(mol.coords, CoordinateSet):
-                new._coords = CoordinateSet(new_coords, mol.coords.system)
+                new.coords = CoordinateSet(new_coords, mol.coords.system)
             else:
-                new._coords = CoordinateSet(new_coords)
+                new.coords = CoordinateSet(new_coords)
         elif isinstance(mol, CoordinateTransform):
             new = super().__call__(mol)
         else:
@@ -28,3 +34,178 @@ class MolecularTransformation(CoordinateTransform):
         return new
     def __call__(self, mol):
         return self.apply(mol)
+
+    @property
+    def rotation(self):
+        """
+        :return: the 3x3 linear part of the transformation
+        :rtype: np.ndarray
+        """
+        pts = np.asarray(super().apply(np.concatenate([np.zeros((1, 3)), np.eye(3)])))
+        return (pts[1:] - pts[0]).T
+    @property
+    def shift(self):
+        return np.asarray(super().apply(np.zeros((1, 3))))[0]
+
+    def embed_tensor(self, tensor, axes=None):
+        """
+        Rotates the Cartesian axes of a derivative tensor (gradient, Hessian, higher derivatives, normal mode matrix)
+        into the transformed frame, using the per-atom 3x3 rotation instead of a dense 3N x 3N one
+
+        :param tensor: the tensor to rotate, with Cartesian axes of length 3N ordered atom-by-atom
+        :type tensor: np.ndarray
+        :param axes: the Cartesian axes of the tensor (defaults to all of them)
+        :type axes: Iterable[int] | None
+        :return:
+        :rtype: np.ndarray
+        """
+        return _rotate_cartesian_axes(tensor, self.rotation, axes)
+
+def _rotate_cartesian_axes(tensor, rotation, axes=None, batched=False):
+    """
+    Applies `rotation` to every atom block of every axis in `axes` with a single `einsum`
+    """
+    tensor = np.asarray(tensor)
+    offset = 1 if batched else 0
+    rank = tensor.ndim - offset
+    if axes is None:
+        axes = range(rank)
+    axes = {a % rank for a in axes}
+
+    shape = list(tensor.shape[:offset])
+    ids = list(range(offset))
+    out_ids = list(ids)
+    rot_args = []
+    next_id = offset
+    for i, n in enumerate(tensor.shape[offset:]):
+        if i in axes:
+            if n % 3 != 0:
+                raise ValueError("axis {} of tensor with shape {} isn't a Cartesian axis".format(i, tensor.shape))
+            atom, old, new = next_id, next_id + 1, next_id + 2
+            next_id += 3
+            shape.extend([n // 3, 3])
+            ids.extend([atom, old])
+            out_ids.extend([atom, new])
+            rot_args.extend([rotation, ids[:offset] + [new, old]])
+        else:
+            shape.append(n)
+            ids.append(next_id)
+            out_ids.append(next_id)
+            next_id += 1
+
+    rotated = np.einsum(tensor.reshape(shape), ids, *rot_args, out_ids, optimize=True)
+    return rotated.reshape(tensor.shape)
+
+class StackedMolecularTransformation:
+    """
+    A stack of affine transformations, one per configuration of a multiconfiguration molecule,
+    held as a single (n, 4, 4) array so that the whole stack can be applied in one operation
+    """
+    def __init__(self, transforms):
+        """
+        :param transforms: (n, 4, 4) affine matrices or (n, 3, 3) rotation matrices
+        :type transforms: np.ndarray
+        """
+        transforms = np.asarray(transforms)
+        if transforms.shape[-2:] == (3, 3):
+            transforms = self._affine(transforms, np.zeros(transforms.shape[:-1]))
+        elif transforms.shape[-2:] != (4, 4):
+            raise ValueError("{}: can't build a stack of transformations from an array of shape {}".format(
+                type(self).__name__,
+                transforms.shape
+            ))
+        self.matrices = transforms
+
+    @staticmethod
+    def _affine(rotations, shifts):
+        tfs = np.zeros(rotations.shape[:-2] + (4, 4))
+        tfs[..., :3, :3] = rotations
+        tfs[..., :3, 3] = shifts
+        tfs[..., 3, 3] = 1
+        return tfs
+    @classmethod
+    def from_parts(cls, rotations, shifts=None):
+        """
+        Builds the stack of transformations x -> R.x + s
+
+        :param rotations: (n, 3, 3) rotation matrices
+        :type rotations: np.ndarray
+        :param shifts: (n, 3) shifts applied after the rotations
+        :type shifts: np.ndarray | None
+        :return:
+        :rtype: StackedMolecularTransformation
+        """
+        rotations = np.asarray(rotations)
+        if shifts is None:
+            shifts = np.zeros(rotations.shape[:-1])
+        return cls(cls._affine(rotations, np.asarray(shifts)))
+
+    @property
+    def rotations(self):
+        return self.matrices[..., :3, :3]
+    @property
+    def shifts(self):
+        return self.matrices[..., :3, 3]
+
+    def __len__(self):
+        return len(self.matrices)
+    def __getitem__(self, item):
+        tfs = self.matrices[item]
+        if tfs.ndim == 2:
+            return MolecularTransformation(tfs)
+        else:
+            return type(self)(tfs)
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def inverse(self):
+        """
+        :return: the stack of inverse transformations
+        :rtype: StackedMolecularTransformation
+        """
+        rots = self.rotations.transpose(0, 2, 1)
+        shifts = -np.einsum('nab,nb->na', rots, self.shifts)
+        return self.from_parts(rots, shifts)
+
+    def apply(self, mol):
+        """
+        Applies every transformation to its configuration at once
+
+        :param mol:
+        :type mol: Molecule | np.ndarray | StackedMolecularTransformation
+        :return:
+        :rtype:
+        """
+        if isinstance(mol, Molecule):
+            new_coords = self.apply(np.asarray(mol.coords))
+            new = mol.copy()
+            if isinstance(mol.coords, CoordinateSet):
+                new.coords = CoordinateSet(new_coords, mol.coords.system)
+            else:
+                new.coords = CoordinateSet(new_coords)
+        elif isinstance(mol, StackedMolecularTransformation):
+            new = type(self)(self.matrices @ mol.matrices)
+        else:
+            coords = np.asarray(mol)
+            if coords.ndim == 2:
+                new = np.einsum('nab,ib->nia', self.rotations, coords)
+            else:
+                new = np.einsum('nab,nib->nia', self.rotations, coords)
+            new = new + self.shifts[:, np.newaxis, :]
+        return new
+    def __call__(self, mol):
+        return self.apply(mol)
+
+    def embed_tensor(self, tensor, axes=None):
+        """
+        Rotates the Cartesian axes of a stack of tensors, one per transformation
+
+        :param tensor: the tensors to rotate, stacked along the first axis
+        :type tensor: np.ndarray
+        :param axes: the Cartesian axes of each tensor (defaults to all of them)
+        :type axes: Iterable[int] | None
+        :return:
+        :rtype: np.ndarray
+        """
+        return _rotate_cartesian_axes(tensor, self.rotations, axes, batched=True)
@@ -11,6 +11,7 @@ from .Transformations import MolecularTransformation
 __all__ = [
     "MolecularVibrations",
     "MolecularNormalModes",
+    "StackedMolecularNormalModes"
 ]
 
 class MolecularVibrations:
@@ -58,6 +59,32 @@ class MolecularVibrations:
     def __len__(self):
         return self._basis.matrix.shape[0]
 
+    def displacement_grid(self, **opts):
+        """
+        Returns the finite difference displacements along these vibrations
+
+        :param opts: options for `FiniteDifferenceDisplacements`
+        :type opts:
+        :return:
+        :rtype: FiniteDifferenceDisplacements
+        """
+        from .Displacements import FiniteDifferenceDisplacements
+        return FiniteDifferenceDisplacements(self._mol, self._basis, **opts)
+
+    def embed(self, frame):
+        """
+        Embeds the vibrations in a new frame
+
+        :param frame:
+        :type frame: MolecularTransformation
+        :return:
+        :rtype: MolecularVibrations
+        """
+        init = self._coords
+        if init is not None and not self._basis.in_internals:
+            init = frame.apply(init)
+        return type(self)(self._mol, self._basis.embed(frame), freqs=self.freqs, init=init)
+
     def displace(self, displacements = None, amt = .1, n = 1, which = 0):
 
         if displacements is None:
@@ -166,8 +193,7 @@ class MolecularNormalModes(CoordinateSystem):
                 ncrds = self.matrix.shape[0]
                 dXdR = intcrds.jacobian(carts, 1).reshape(ncrds, ncrds)
                 dRdX = ccoords.jacobian(internals, 1).reshape(ncrds, ncrds)
-                masses = self.molecule.masses
-                mass_conv = np.sqrt(np.broadcast_to(masses[:, np.newaxis], (3, len(masses))).flatten())
+                mass_conv = np.sqrt(self.molecule.triple_masses)
                 dYdR = dXdR * mass_conv[np.newaxis]
                 dRdY = dRdX / mass_conv[:, np.newaxis]
 
@@ -189,31 +215,33 @@ class MolecularNormalModes(CoordinateSystem):
 
     def embed(self, frame):
         """
+        Rotates the modes into a new frame, rotating the Cartesian axes of the mode matrix and its inverse
+        with one contraction each
 
         :param frame:
         :type frame: MolecularTransformation
         :return:
-        :rtype:
+        :rtype: MolecularNormalModes
         """
 
-        raise NotImplementedError("Haven't finished doing this... :)")
-
-        import copy
-
         if self.in_internals:
             raise ValueError("Internal coordinate normals modes can't be re-embedded")
 
-        tmat = frame.matrix
-        mat = self.matrix
-        mat = tmat@mat
-
+        mat = frame.embed_tensor(self.matrix, axes=[0])
+        inv = self.inverse
+        if inv is not None:
+            inv = frame.embed_tensor(inv, axes=[1])
         orig = self.origin
-        orig = tmat@orig
+        if orig is not None:
+            orig = frame.apply(np.asarray(orig))
 
         return type(self)(
             self.molecule,
             mat,
-            origin = orig
+            name=self.name,
+            freqs=self.freqs,
+            origin=orig,
+            inverse=inv
         )
 
 
@@ -272,8 +300,14 @@ class MolecularNormalModes(CoordinateSystem):
         if masses is not None:
             masses = np.asarray(masses)
             masses = masses*mass_conv
+            if (
+                    remove_transrot
+                    and masses.ndim == 1 and len(fcs) == 3*len(masses)
+                    and molecule is not None and not molecule.multiconfig
+            ):
+                return cls._from_projected_force_constants(molecule, fcs, masses, normalize=normalize, **opts)
             if masses.ndim == 1:
-                masses = np.broadcast_to(masses, (len(masses), 3)).T.flatten()
+                masses = np.repeat(masses, 3)
                 masses = np.diag(masses)
                 inverse_mass_matrix = True
         else:
@@ -292,4 +326,146 @@ class MolecularNormalModes(CoordinateSystem):
         freqs = freqs[sorting]
         modes = modes[:, sorting]
 
-        return cls(molecule, modes, freqs = freqs, **opts)
\ No newline at end of file
+        return cls(molecule, modes, freqs = freqs, **opts)
+
+    @staticmethod
+    def _project_transrot(hess, coords, masses):
+        """
+        Projects the translations and rotations out of mass-weighted Hessians and shifts them
+        above the rest of the spectrum so that they come last out of `eigh`, regardless of how close to
+        zero (or how imaginary) the vibrational frequencies are
+
+        :return: the shifted Hessians and the number of vibrations
+        :rtype: (np.ndarray, int)
+        """
+        from .Properties import MolecularProperties
+
+        tr_vecs, _, proj = MolecularProperties.get_prop_translation_rotation_projector(coords, masses)
+        shift = 1 + 2 * np.max(np.sum(np.abs(hess), axis=-1), axis=-1)
+        hess = proj @ hess @ proj + shift[..., np.newaxis, np.newaxis] * (tr_vecs @ np.swapaxes(tr_vecs, -1, -2))
+        return hess, hess.shape[-1] - tr_vecs.shape[-1]
+
+    @classmethod
+    def _from_projected_force_constants(cls, molecule, fcs, masses, normalize=True, **opts):
+        """
+        Gets the normal modes for Cartesian force constants by diagonalizing the mass-weighted Hessian
+        with the translations and rotations projected out
+        """
+        m_inv = 1/np.sqrt(np.repeat(masses, 3))
+        hess = fcs * m_inv[:, np.newaxis] * m_inv[np.newaxis, :]
+        hess, nvib = cls._project_transrot(hess, np.asarray(molecule.coords), masses)
+        freqs, vecs = np.linalg.eigh(hess)
+        freqs = freqs[:nvib]
+        vecs = vecs[:, :nvib]
+
+        modes = m_inv[:, np.newaxis] * vecs
+        if normalize:
+            modes = modes / np.linalg.norm(modes, axis=0)[np.newaxis, :]
+        freqs = np.sign(freqs) * np.sqrt(np.abs(freqs))
+
+        return cls(molecule, modes, freqs = freqs, **opts)
+
+    @classmethod
+    def from_force_constants_batch(cls,
+                                   molecule,
+                                   fcs,
+                                   masses = None,
+                                   coords = None,
+                                   mass_units = "AtomicMassUnits",
+                                   remove_transrot = True,
+                                   normalize = True
+                                   ):
+        """
+        Generates normal modes for a stack of Hessians and/or a stack of mass vectors at once,
+        e.g. for instantaneous normal modes along a trajectory or for a set of isotopologues.
+        Everything broadcasts over the leading axes, so a single Hessian can be paired with many mass
+        vectors or vice versa.
+
+        :param molecule:
+        :type molecule: Molecule
+        :param fcs: (..., 3n, 3n) force constants
+        :type fcs: np.ndarray
+        :param masses: (..., n) masses (defaults to the masses of `molecule`)
+        :type masses: np.ndarray | None
+        :param coords: (..., n, 3) coordinates used to build the translations and rotations (defaults to the coordinates of `molecule`)
+        :type coords: np.ndarray | None
+        :param mass_units: units for the masses
+        :type mass_units: str
+        :param remove_transrot: whether or not to project out the translations and rotations (default: `True`)
+        :type remove_transrot: bool
+        :param normalize: whether or not to normalize the modes (default: `True`)
+        :type normalize: bool
+        :return: a stack of modes, or a single set of modes if nothing was stacked
+        :rtype: StackedMolecularNormalModes | MolecularNormalModes
+        """
+        if masses is None:
+            masses = molecule.masses
+            mass_units = "AtomicMassUnits"
+        if mass_units != "AtomicUnitOfMass" and mass_units != "ElectronMass":
+            masses = np.asarray(masses) * UnitsData.convert(mass_units, "AtomicUnitOfMass")
+        else:
+            masses = np.asarray(masses)
+        fcs = np.asarray(fcs)
+
+        # mass-weighting by broadcasting turns the generalized problem into a standard one
+        tripmass = np.repeat(masses, 3, axis=-1)
+        m_inv = 1/np.sqrt(tripmass)
+        hess = fcs * m_inv[..., :, np.newaxis] * m_inv[..., np.newaxis, :]
+        if remove_transrot:
+            if coords is None:
+                coords = molecule.coords
+            hess, nvib = cls._project_transrot(hess, np.asarray(coords), masses)
+        eigs, vecs = np.linalg.eigh(hess)
+        if remove_transrot:
+            eigs = eigs[..., :nvib]
+            vecs = vecs[..., :nvib]
+
+        modes = m_inv[..., :, np.newaxis] * vecs
+        inverse = np.swapaxes(vecs, -1, -2) * np.sqrt(tripmass)[..., np.newaxis, :]
+        if normalize:
+            norms = np.linalg.norm(modes, axis=-2)
+            modes = modes / norms[..., np.newaxis, :]
+            inverse = inverse * norms[..., :, np.newaxis]
+        freqs = np.sign(eigs) * np.sqrt(np.abs(eigs))
+
+        if freqs.ndim == 1:
+            return cls(molecule, modes, freqs=freqs, inverse=inverse)
+        else:
+            return StackedMolecularNormalModes(molecule, modes, freqs, inverse)
+
+class StackedMolecularNormalModes:
+    """
+    A stack of normal mode analyses (e.g. along a trajectory or over a set of isotopologues)
+    held as single arrays so that they can be worked with in bulk
+    """
+    def __init__(self, molecule, matrices, freqs, inverses=None):
+        """
+        :param molecule: the molecule the modes were computed for
+        :type molecule: Molecule
+        :param matrices: (k, 3n, m) Cartesian displacements for the modes
+        :type matrices: np.ndarray
+        :param freqs: (k, m) frequencies
+        :type freqs: np.ndarray
+        :param inverses: (k, m, 3n) inverses of the mode matrices
+        :type inverses: np.ndarray | None
+        """
+        self.molecule = molecule
+        self.matrices = matrices
+        self.freqs = freqs
+        if inverses is None:
+            inverses = np.linalg.pinv(matrices)
+        self.inverses = inverses
+
+    def __len__(self):
+        return len(self.freqs)
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            mol = self.molecule
+            if mol.multiconfig and len(mol) == len(self):
+                mol = mol[item]
+            return MolecularNormalModes(mol, self.matrices[item], freqs=self.freqs[item], inverse=self.inverses[item])
+        else:
+            return type(self)(self.molecule, self.matrices[item], self.freqs[item], self.inverses[item])
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
@@ -5,6 +5,9 @@ Molecules provides wrapper utilities for working with and visualizing molecular
 from .Vibrations import *
 from .Molecule import *
 from .CoordinateSystems import *
+from .Displacements import *
+from .Ensembles import *
+from .Fragments import *
 
 # getting the full list of symbols explicitly in an __all__ variable
 __all__ = []
@@ -13,4 +16,10 @@ __all__ += exposed
 from .Molecule import __all__ as exposed
 __all__ += exposed
 from .CoordinateSystems import __all__ as exposed
-__all__ += exposed
\ No newline at end of file
+__all__ += exposed
+from .Displacements import __all__ as exposed
+__all__ += exposed
+from .Ensembles import __all__ as exposed
+__all__ += exposed
+from .Fragments import __all__ as exposed
+__all__ += exposed
@@ -143,7 +143,7 @@ class ExpansionTerms:
 
     @staticmethod
     def _tripmass(masses):
-        return np.broadcast_to(masses, (len(masses), 3)).T.flatten()
+        return np.repeat(masses, 3)
 
     def get_terms(self):
         raise NotImplemented
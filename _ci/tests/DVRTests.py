@@ -4,6 +4,13 @@ from unittest import TestCase
 from Psience.DVR.DVR import *
 import numpy as np
 
+def _ho_2D(grid):
+    return 1/2*np.power(grid[:, 0], 2) + 1/2*np.power(grid[:, 1], 2)
+def _run_ho_2D(dvr):
+    # module level so that it can be shipped to worker processes
+    res = dvr.run(potential_function=_ho_2D, domain=((-5, 5),)*2, divs=(25, 25))
+    return res.wavefunctions.energies[:4]
+
 class DVRTests(TestCase):
 
     def ho(self, grid, k=1):
@@ -41,3 +48,72 @@ class DVRTests(TestCase):
         self.assertIsInstance(res.wavefunctions[0].data, np.ndarray)
 
 
+    @validationTest
+    def test_pruned_3D(self):
+        dvr_3D = DVR("ColbertMillerND")
+        full = dvr_3D.run(potential_function=self.ho_3D, domain=((-5, 5),)*3, divs=(15,)*3)
+        res = dvr_3D.run(potential_function=self.ho_3D, domain=((-5, 5),)*3, divs=(15,)*3, potential_cutoff=8)
+        self.assertLess(res.hamiltonian.shape[0], 15**3)
+        self.assertEquals(res.wavefunctions[0].data.shape, (15**3,))
+        self.assertTrue(np.allclose(res.wavefunctions.energies[:4], full.wavefunctions.energies[:4], atol=1e-3))
+
+    @validationTest
+    def test_contracted_3D(self):
+        full = DVR("ColbertMillerND").run(potential_function=self.ho_3D, domain=((-5, 5),)*3, divs=(15,)*3)
+        dvr_3D = DVR("ContractedND")
+        res = dvr_3D.run(potential_function=self.ho_3D, domain=((-5, 5),)*3, divs=(15,)*3,
+                         contraction_cutoff=8, num_workers=2)
+        self.assertLess(res.hamiltonian.shape[0], 15**3)
+        self.assertEquals(res.wavefunctions[0].data.shape, (15**3,))
+        self.assertTrue(np.allclose(res.wavefunctions.energies[:4], full.wavefunctions.energies[:4], atol=1e-3))
+
+    @validationTest
+    def test_contracted_pruned_3D(self):
+        opts = dict(potential_function=self.ho_3D, domain=((-5, 5),)*3, divs=(15,)*3, potential_cutoff=8)
+        pruned = DVR("ColbertMillerND").run(eigensolver='dense', **opts)
+        res = DVR("ContractedND").run(num_contracted=15**2, **opts)
+        self.assertEquals(res.wavefunctions[0].data.shape, (15**3,))
+        self.assertTrue(np.allclose(res.wavefunctions.energies[:4], pruned.wavefunctions.energies[:4]))
+
+    @validationTest
+    def test_warm_start_3D(self):
+        dvr_3D = DVR("ColbertMillerND")
+        opts = dict(domain=((-5, 5),)*3, divs=(15,)*3)
+        ref = dvr_3D.run(potential_function=self.ho_3D, eigensolver='dense', **opts)
+        res = dvr_3D.run(potential_function=lambda g:self.ho_3D(g, k1=1.01), eigensolver='lobpcg', initial_guess=ref, **opts)
+        self.assertTrue(np.allclose(res.wavefunctions.energies[:4], ref.wavefunctions.energies[:4], atol=1e-2))
+        res = dvr_3D.run(potential_function=self.ho_3D, eigensolver='shift-invert', **opts)
+        self.assertTrue(np.allclose(res.wavefunctions.energies[:4], ref.wavefunctions.energies[:4]))
+
+    @validationTest
+    def test_pickle_dvr(self):
+        import pickle
+        from concurrent.futures import ProcessPoolExecutor
+        dvr_2D = pickle.loads(pickle.dumps(DVR("ColbertMillerND")))
+        ref = _run_ho_2D(dvr_2D)
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            engs = list(executor.map(_run_ho_2D, [dvr_2D, DVR("ColbertMillerND")]))
+        for e in engs:
+            self.assertTrue(np.allclose(e, ref))
+        self.assertIn("ColbertMillerND", DVR.registry)
+
+    @validationTest
+    def test_interpolated_2D(self):
+        from Psience.DVR import PotentialInterpolator
+        pts = np.random.uniform(-6, 6, (3000, 2))
+        data = np.column_stack([pts, self.ho_2D(pts)])
+        dvr_2D = DVR("ColbertMillerND", potential_grid=data, domain=((-4, 4),)*2)
+        self.assertIsInstance(dvr_2D.params['potential_grid'], PotentialInterpolator)
+        for divs in [(25, 25), (31, 31)]:
+            res = dvr_2D.run(divs=divs)
+            self.assertTrue(np.allclose(res.wavefunctions.energies[:3], [1, 2, 2], atol=.05))
+
+    @validationTest
+    def test_interpolated_mesh_bounds(self):
+        x = np.linspace(-3, 3, 41)
+        mesh = np.moveaxis(np.array(np.meshgrid(x, x, indexing='ij')), 0, -1)
+        data = np.concatenate([mesh, self.ho_2D(mesh.reshape(-1, 2)).reshape(41, 41, 1)], axis=-1)
+        dvr_2D = DVR("ColbertMillerND", domain=((-4, 4),)*2)
+        with self.assertRaises(ValueError):
+            dvr_2D.run(divs=(21, 21), potential_grid=data)
+
@@ -90,6 +90,205 @@ class MolecoolsTests(TestCase):
         # Plot(dists, dips[:, 2], figure=p2)
         # g.show()
 
+    @validationTest
+    def test_BatchedEckart(self):
+        ref = Molecule.from_file(self.test_fchk)
+        ref_coords = np.asarray(ref.coords)
+        angs = np.linspace(0, 2*np.pi, 50)
+        rots = np.zeros((50, 3, 3))
+        rots[:, 0, 0] = np.cos(angs); rots[:, 0, 1] = -np.sin(angs)
+        rots[:, 1, 0] = np.sin(angs); rots[:, 1, 1] = np.cos(angs)
+        rots[:, 2, 2] = 1
+        walkers = np.einsum('nab,ib->nia', rots, ref_coords) + np.random.rand(50, 1, 3)
+        scan = Molecule(ref.atoms, walkers)
+
+        emb = scan.eckart_embedded_coords(ref)
+        self.assertEquals(emb.shape, (50, 3, 3))
+        self.assertTrue(np.allclose(emb, ref_coords[np.newaxis]))
+        eck_rots = scan.prop('eckart_rotations', ref)
+        self.assertTrue(np.allclose(np.linalg.det(eck_rots), 1.))
+
+    @validationTest
+    def test_StackedPrincipleAxes(self):
+        from Psience.Molecools.Transformations import StackedMolecularTransformation
+        from Psience.Molecools.Properties import MolecularProperties
+        ref = Molecule.from_file(self.test_fchk)
+        walkers = np.asarray(ref.coords)[np.newaxis] + .1*np.random.rand(25, 3, 3)
+        scan = Molecule(ref.atoms, walkers)
+
+        frames = scan.principle_axis_frame(inverse=True)
+        self.assertIsInstance(frames, StackedMolecularTransformation)
+        self.assertEquals(frames.matrices.shape, (25, 4, 4))
+        rot = frames.apply(scan)
+        tens = MolecularProperties.get_prop_inertia_tensors(np.asarray(rot.coords), scan.masses)
+        self.assertTrue(np.allclose(tens - tens*np.eye(3)[np.newaxis], 0.))
+
+    @validationTest
+    def test_FChkCache(self):
+        from Psience.Data import FChkCache, PotentialSurface
+        FChkCache.clear()
+        m = Molecule.from_file(self.test_HOD)
+        self.assertEquals(len(FChkCache._cache), 1)
+        blocks = next(iter(FChkCache._cache.values()))
+        self.assertIn('ForceConstants', blocks)
+        self.assertIs(m.force_constants, blocks['ForceConstants'].array)
+        self.assertFalse(m.force_constants.flags.writeable)
+        self.assertEquals(len(m.normal_modes.freqs), 3)
+        PotentialSurface.from_fchk_file(self.test_HOD)
+        self.assertEquals(len(FChkCache._cache), 1)
+
+    @validationTest
+    def test_MoleculeArchive(self):
+        import tempfile, os
+        m = Molecule.from_file(self.test_HOD, bonds=[[0, 1, 1], [0, 2, 1]])
+        with tempfile.TemporaryDirectory() as d:
+            arch = os.path.join(d, "HOD.npz")
+            m.save_archive(arch)
+            m2 = Molecule.from_file(arch)
+            self.assertEquals(m2.atoms, m.atoms)
+            self.assertTrue(np.allclose(m2.coords, m.coords))
+            self.assertTrue(np.allclose(m2.force_constants, m.force_constants))
+            self.assertEquals(len(m2.potential_derivatives), 4)
+            self.assertTrue(np.allclose(m2.normal_modes.freqs, m.normal_modes.freqs))
+            del m2
+
+    @validationTest
+    def test_StreamingTrajectory(self):
+        traj = TestManager.test_data("test_100.xyz")
+        chunks = list(Molecule.iter_file(traj, chunk_size=30, units="AtomicUnitOfLength"))
+        self.assertEquals([len(c) for c in chunks], [30, 30, 30, 10])
+        self.assertIs(chunks[0]._ats, chunks[-1]._ats)
+        self.assertIs(chunks[0].bonds, chunks[-1].bonds)
+        self.assertEquals(chunks[-1].center_of_mass.shape, (10, 3))
+        scan = Molecule.from_file(self.test_log_water)
+        streamed = np.concatenate([np.asarray(c.coords) for c in Molecule.iter_file(self.test_log_water, chunk_size=64)])
+        self.assertTrue(np.allclose(streamed, scan.coords))
+
+    @validationTest
+    def test_MoleculeViews(self):
+        scan = Molecule.from_file(self.test_log_water)
+        com = scan.center_of_mass
+        frame = scan[3]
+        self.assertIs(frame.atom_table, scan.atom_table)
+        self.assertTrue(np.shares_memory(np.asarray(frame.coords), np.asarray(scan.coords)))
+        self.assertTrue(np.allclose(frame.center_of_mass, com[3]))
+        frame.coords = np.asarray(frame.coords) + 1.
+        self.assertFalse(np.allclose(frame.coords, scan.coords[3]))
+        self.assertEquals(sum(1 for _ in scan), len(scan))
+        oh = scan[:, [0, 1]]
+        self.assertEquals(oh.atoms, scan.atoms[:2])
+        self.assertEquals(oh.coords.shape, (len(scan), 2, 3))
+
+    @validationTest
+    def test_RotationalConstants(self):
+        scan = Molecule.from_file(self.test_log_water)
+        consts = scan.rotational_constants
+        self.assertEquals(consts.shape, (len(scan), 3))
+        self.assertIs(scan.rotational_constants, consts)
+        self.assertTrue(np.allclose(scan[2].rotational_constants, consts[2]))
+        self.assertTrue(np.all(np.diff(consts, axis=1) <= 0))
+        single = Molecule(scan.atoms, scan.coords[2])
+        self.assertTrue(np.allclose(single.rotational_constants, consts[2]))
+
+    @validationTest
+    def test_AtomTable(self):
+        m = Molecule.from_file(self.test_HOD)
+        self.assertEquals(m.atom_table.isotopes.tolist(), [16, 1, 2])
+        self.assertEquals(m.atomic_numbers.tolist(), [8, 1, 1])
+        self.assertIs(m.triple_masses, m.triple_masses)
+        self.assertTrue(np.allclose(m.triple_masses, np.repeat(m.masses, 3)))
+        com = m.center_of_mass
+        self.assertIs(m.center_of_mass, com)
+        m.masses = [m.masses[0], m.masses[1], m.masses[1]]
+        self.assertEquals(m.atom_table.isotopes.tolist(), [16, 1, 1])
+        self.assertFalse(np.allclose(m.center_of_mass, com))
+
+    @validationTest
+    def test_BatchedNormalModes(self):
+        m = Molecule.from_file(self.test_HOD)
+        fcs = m.force_constants
+        single = MolecularNormalModes.from_force_constants(m, fcs, m.atoms)
+        isotopologues = np.array([m.masses, [m.masses[0], m.masses[1], m.masses[1]]])
+        stack = MolecularNormalModes.from_force_constants_batch(m, fcs, masses=isotopologues)
+        self.assertEquals(stack.freqs.shape, (2, 3))
+        self.assertTrue(np.allclose(stack.freqs[0], single.freqs, atol=1e-5))
+        self.assertTrue(np.all(stack.freqs[1] > stack.freqs[0]))
+        self.assertTrue(np.allclose(stack[1].inverse @ stack[1].matrix, np.eye(3)))
+
+    @validationTest
+    def test_TransRotProjector(self):
+        m = Molecule.from_file(self.test_HOD)
+        vecs, moms, proj = m.prop('translation_rotation_projector')
+        self.assertEquals(vecs.shape, (9, 6))
+        self.assertTrue(np.allclose(vecs.T @ vecs, np.eye(6)))
+        self.assertTrue(np.allclose(proj @ vecs, 0.))
+        self.assertIs(m.prop('translation_rotation_projector')[2], proj)
+        modes = MolecularNormalModes.from_force_constants(m, m.force_constants)
+        self.assertEquals(modes.matrix.shape, (9, 3))
+        self.assertTrue(np.allclose(modes.freqs, m.normal_modes.freqs, atol=1e-5))
+
+    @validationTest
+    def test_EmbeddedDerivatives(self):
+        m = Molecule.from_file(self.test_HOD)
+        emb = m.get_embedded_molecule()
+        grad, fcs, thirds, fourths = emb.potential_derivatives
+        fcs_0 = m.force_constants
+        self.assertTrue(np.allclose(np.linalg.eigvalsh(fcs), np.linalg.eigvalsh(fcs_0)))
+        self.assertEquals(thirds.shape, m.potential_derivatives[2].third_deriv_array.shape)
+        modes = emb.normal_modes.basis
+        self.assertTrue(np.allclose(modes.matrix.T @ fcs @ modes.matrix, m.normal_modes.basis.matrix.T @ fcs_0 @ m.normal_modes.basis.matrix))
+
+    @validationTest
+    def test_DisplacementGrid(self):
+        m = Molecule.from_file(self.test_HOD)
+        fcs = m.force_constants
+        ref = np.asarray(m.coords).flatten()
+        fd = m.normal_modes.displacement_grid(order=2, data="gradients")
+        grads = np.concatenate([
+            (batch.reshape(len(batch), -1) - ref) @ fcs
+            for batch in fd.batches(batch_size=4)
+        ])
+        self.assertEquals(len(grads), len(fd))
+        grad, fcs_fd = fd.assemble(grads)
+        L = m.normal_modes.basis.matrix
+        self.assertTrue(np.allclose(L.T @ fcs_fd @ L, L.T @ fcs @ L))
+
+    @validationTest
+    def test_BatchedZMatrixConversion(self):
+        from Psience.Molecools.CoordinateSystems import MolecularCartesianToMatrixConverter
+        m = Molecule.from_file(self.test_HOD, zmatrix=[[0, -1, -1, -1], [1, 0, -1, -1], [2, 0, 1, -1]])
+        crds = np.asarray(m.coords)
+        ints = np.asarray(m.internal_coordinates)
+        self.assertTrue(np.allclose(ints[1:, 0], np.linalg.norm(crds[1:] - crds[0], axis=1)))
+        opts = m.internal_coordinates.system.converter_options
+        # the generic McUtils conversion the fast path replaced, run on the same dummy-atom augmented coordinates
+        from McUtils.Coordinerds import CoordinateSet, CartesianCoordinates3D, ZMatrixCoordinates
+        from Psience.Molecools.CoordinateSystems import _augmented_ordering
+        origin = np.reshape(opts['origins'], (1, 3))
+        augmented = np.concatenate([origin, origin + np.reshape(opts['axes'], (2, 3)), crds])
+        generic = CoordinateSet(augmented, CartesianCoordinates3D).convert(
+            ZMatrixCoordinates, ordering=np.array(_augmented_ordering(opts['ordering'])[1])
+        )
+        generic = np.asarray(generic[0] if isinstance(generic, tuple) else generic)[2:]
+        self.assertTrue(np.allclose(ints, generic))
+        walkers = np.broadcast_to(crds, (10,) + crds.shape)
+        out = np.empty((10, 3, 3))
+        zm, _ = MolecularCartesianToMatrixConverter.convert_many(
+            walkers, origins=opts['origins'], axes=opts['axes'], ordering=opts['ordering'], out=out
+        )
+        self.assertIs(zm, out)
+        self.assertTrue(np.allclose(out, generic[np.newaxis]))
+
+    @validationTest
+    def test_WalkerEnsemble(self):
+        from Psience.Molecools import WalkerEnsemble
+        scan = Molecule.from_file(self.test_log_water)
+        ens = WalkerEnsemble.from_molecule(scan, chunk_size=16, num_workers=4)
+        props = ens.compute('center_of_mass', 'inertia_tensors', 'eckart_rotations', reference=scan.coords[0])
+        self.assertTrue(np.allclose(props['center_of_mass'], scan.center_of_mass))
+        self.assertEquals(props['inertia_tensors'].shape, (len(scan), 3, 3))
+        self.assertTrue(np.allclose(props['eckart_rotations'][0], np.eye(3)))
+
     @validationTest
     def test_Plotting(self):
 
@@ -130,7 +329,26 @@ class MolecoolsTests(TestCase):
     @inactiveTest
     def test_BondGuessing(self):
         m = Molecule.from_file(self.test_fchk)
-        self.assertEquals(m.bonds, [[0, 1, 1], [0, 2, 1]])
+        self.assertEquals(m.bonds.tolist(), [[0, 1, 1], [0, 2, 1]])
+
+    @validationTest
+    def test_BatchedBondGuessing(self):
+        m = Molecule.from_file(self.test_fchk)
+        walkers = np.asarray(m.coords)[np.newaxis] + .01*np.random.rand(100, 3, 3)
+        bonds = Molecule(m.atoms, walkers).prop('guessed_bonds')
+        self.assertEquals(len(bonds), 100)
+        self.assertEquals(bonds[0], [[0, 1, 1], [0, 2, 1]])
+
+    @validationTest
+    def test_FragmentTracking(self):
+        m = Molecule.from_file(self.test_fchk)
+        crds = np.asarray(m.coords)
+        dimer = np.concatenate([crds, crds + np.array([[20., 0., 0.]])])
+        traj = dimer[np.newaxis] + .01*np.random.rand(10, 6, 3)
+        frags = Molecule(m.atoms * 2, traj).prop('fragment_indices')
+        self.assertEquals(len(frags), 10)
+        self.assertEquals([f.tolist() for f in frags[0]], [[0, 1, 2], [3, 4, 5]])
+        self.assertIs(frags[0], frags[-1])
 
     @inactiveTest
     def test_Frags(self):
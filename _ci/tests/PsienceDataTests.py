@@ -1,6 +1,7 @@
 
 from Peeves.TestUtils import *
 from Psience.Data import *
+from McUtils.Zachary import MultiSurface
 from McUtils.Coordinerds import cartesian_to_zmatrix
 from McUtils.Plots import *
 from unittest import TestCase
@@ -23,6 +24,42 @@ class PsienceDataTests(TestCase):
             [[0, 0, 0], [1, 0, 0], [0, 1, 0]]
         ]).shape, (2, 3))
 
+    @validationTest
+    def test_ChunkedDipoleSurface(self):
+        fchk = TestManager.test_data("HOD_freq.fchk")
+        surf = DipoleSurface.from_fchk_file(fchk)
+        center = surf.surfs[0].base.data['center']
+        walkers = center.reshape(3, 3)[np.newaxis] + .1*np.random.rand(1000, 3, 3)
+        dips = surf(walkers)
+        self.assertEquals(dips.shape, (1000, 3))
+        out = np.empty((1000, 3))
+        chunked = surf(walkers, chunk_size=128, num_workers=4, out=out)
+        self.assertTrue(np.shares_memory(chunked, out))
+        with self.assertRaises(ValueError):
+            surf(walkers, out=np.empty((3, 1000)).T)
+        self.assertTrue(np.allclose(chunked, dips))
+        single = walkers[0]
+        fused = surf(single)
+        serial = MultiSurface.__call__(surf, single.flatten())
+        self.assertEquals(fused.shape, serial.shape)
+        self.assertTrue(np.allclose(fused, serial))
+        serial = MultiSurface.__call__(surf, walkers.reshape(1000, 9))
+        self.assertTrue(np.allclose(serial, dips))
+
+    @validationTest
+    def test_CompiledPotentialSurface(self):
+        fchk = TestManager.test_data("HOD_freq.fchk")
+        surf = PotentialSurface.from_fchk_file(fchk)
+        plan = surf.compile()
+        self.assertIs(surf.compile(), plan)
+        center, energy, _ = surf.expansion
+        self.assertTrue(np.allclose(plan(center), energy))
+        walkers = center.reshape(3, 3)[np.newaxis] + .01*np.random.rand(100, 3, 3)
+        self.assertEquals(plan(walkers, chunk_size=32).shape, (100,))
+        self.assertTrue(np.allclose(plan(walkers), surf(walkers.reshape(100, 9))))
+        q = (walkers.reshape(100, 9) - center) @ plan.inverse.T
+        self.assertTrue(np.allclose(plan.evaluate_coordinates(q), plan(walkers)))
+
     @debugTest
     def test_LogFileDipoleSurface(self):
         log = TestManager.test_data("water_OH_scan.log")
@@ -44,10 +81,51 @@ class PsienceDataTests(TestCase):
         #     [[0, 0, 0], [1, 0, 0], [0, 1, 0]]
         # ]).shape, (2, 3))
 
+    @validationTest
+    def test_MultiFileScan(self):
+        import tempfile, os
+        log = TestManager.test_data("water_OH_scan.log")
+        conv = lambda x: np.linalg.norm(x[:, 0] - x[:, 1], axis=1)
+        single = PotentialSurface.from_log_file(log, conv)
+        pts = np.arange(.9, 1.5, .1)
+        with tempfile.TemporaryDirectory() as d:
+            cache = os.path.join(d, "scan.npz")
+            merged = PotentialSurface.from_log_files([log, log], conv, num_workers=2, cache=cache)
+            self.assertTrue(os.path.isfile(cache))
+            self.assertTrue(np.allclose(merged(pts), single(pts)))
+            cached = PotentialSurface.from_log_files([log, log], conv, cache=cache)
+            self.assertTrue(np.allclose(cached(pts), single(pts)))
+            del cached
+
     @debugTest
     def test_LogFilePotentialSurface(self):
         log = TestManager.test_data("water_OH_scan.log")
         conv = lambda x: np.linalg.norm(x[:, 0] - x[:, 1], axis=1)
         surf = PotentialSurface.from_log_file(log, conv)
         pots = surf(np.arange(.5, 2, .1))
-        self.assertEquals(pots.shape, ((2-.5)/.1,))
\ No newline at end of file
+        self.assertEquals(pots.shape, ((2-.5)/.1,))
+
+    @validationTest
+    def test_SavedSurfaces(self):
+        import tempfile, os
+        fchk = TestManager.test_data("HOD_freq.fchk")
+        log = TestManager.test_data("water_OH_scan.log")
+        conv = lambda x: np.linalg.norm(x[:, 0] - x[:, 1], axis=1)
+        pts = np.arange(.9, 1.5, .1)
+        with tempfile.TemporaryDirectory() as d:
+            scan = PotentialSurface.from_log_file(log, conv)
+            loaded = PotentialSurface.load(scan.save(os.path.join(d, "scan.npz")))
+            self.assertTrue(np.allclose(loaded(pts), scan(pts)))
+
+            dips = DipoleSurface.from_fchk_file(fchk)
+            center = dips.surfs[0].base.data['center']
+            walkers = center.reshape(3, 3)[np.newaxis] + .1*np.random.rand(10, 3, 3)
+            loaded = DipoleSurface.load(dips.save(os.path.join(d, "dips.npz")))
+            self.assertTrue(np.allclose(loaded(walkers), dips(walkers)))
+
+            pots = PotentialSurface.from_fchk_file(fchk)
+            loaded = PotentialSurface.load(pots.save(os.path.join(d, "pots.npz")))
+            self.assertEquals(loaded.source_file, fchk)
+            self.assertTrue(np.allclose(loaded(walkers.reshape(10, 9)), pots(walkers.reshape(10, 9))))
+            self.assertTrue(np.allclose(loaded.compile()(walkers), pots.compile()(walkers)))
+            del loaded